@@ -0,0 +1,93 @@
+import hashlib
+import mmap
+import os
+import struct
+from typing import Callable
+
+MAGIC = b"SCRA"
+VERSION = 1
+HEADER = struct.Struct("<4sHIII")
+
+Frames = list[tuple[bytes | memoryview, tuple[int, int]]]
+
+
+class AssetCache(object):
+    def __init__(self, directory: str):
+        """Decoded RGBA pixels baked to raw files keyed by source path, mtime and variant (e.g. scale).
+        Cached files are memory mapped copy on write, so Surfaces built from them can still be drawn into"""
+        self.directory = directory
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, path: str, variant) -> str:
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{variant}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".raw")
+
+    def read(self, cache_path: str) -> Frames | None:
+        try:
+            with open(cache_path, "rb") as f:
+                try:
+                    buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+                except (OSError, ValueError):
+                    # No mmap on this platform, read the pixels instead
+                    buffer = memoryview(bytearray(f.read()))
+        except OSError:
+            return None
+        if len(buffer) < HEADER.size:
+            return None
+        magic, version, width, height, count = HEADER.unpack(buffer[:HEADER.size])
+        frame_size = width * height * 4
+        if magic != MAGIC or version != VERSION or len(buffer) != HEADER.size + frame_size * count:
+            return None
+        return [(buffer[HEADER.size + i * frame_size:HEADER.size + (i + 1) * frame_size], (width, height))
+                for i in range(count)]
+
+    def write(self, cache_path: str, frames: Frames):
+        """Write frames of one size, other assets are left uncached"""
+        size = frames[0][1]
+        if any(frame_size != size for _, frame_size in frames):
+            return
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, size[0], size[1], len(frames)))
+                for data, _ in frames:
+                    f.write(data)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            # A read only file system just means no cache
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def cached(self, path: str, variant) -> Frames | None:
+        """RGBA frames of an asset when it is baked, None otherwise, nothing is decoded"""
+        if not self.enabled:
+            return None
+        if (frames := self.read(self.path_for(path, variant))) is not None:
+            self.hits += 1
+        return frames
+
+    def load(self, path: str, variant, decode: Callable[[str], Frames]) -> Frames:
+        """RGBA frames of an asset from the cache, or from decode(path) which are then baked"""
+        if not self.enabled:
+            return decode(path)
+        cache_path = self.path_for(path, variant)
+        if (frames := self.read(cache_path)) is not None:
+            self.hits += 1
+            return frames
+        self.misses += 1
+        frames = decode(path)
+        if frames:
+            self.write(cache_path, frames)
+        return frames
+
+    def clear(self):
+        """Delete every baked file"""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".raw") or name.endswith(".tmp"):
+                os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,82 @@
+import pygame
+from pygame import Surface, Rect
+
+
+class Atlas(object):
+    def __init__(self, page_size: tuple[int, int] = (512, 512), max_size: int = 256):
+        """Shelf packer that copies small images into a few large page surfaces.
+        add hands back a subsurface of a page, it blits like the original (fblits included) and its area on the page
+        is get_offset() and get_size(). Images with a side over max_size are left standalone"""
+        self.page_size = page_size
+        self.max_size = min(max_size, *page_size)
+        self.pages: list[Surface] = []
+        # Per page, shelves as [y, height, used width] and the top of the free space below them
+        self.shelves: list[list[list[int]]] = []
+        self.tops: list[int] = []
+        self.packed = 0
+        self.packed_area = 0
+
+    def _new_page(self) -> int:
+        page = Surface(self.page_size, pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            page = page.convert_alpha()
+        page.fill((0, 0, 0, 0))
+        self.pages.append(page)
+        self.shelves.append([])
+        self.tops.append(0)
+        return len(self.pages) - 1
+
+    def _place(self, width: int, height: int) -> tuple[int, int, int]:
+        """Page index and top left for a width x height area, the shelf wasting the least height wins"""
+        best = None
+        for p, shelves in enumerate(self.shelves):
+            for shelf in shelves:
+                if shelf[1] >= height and shelf[2] + width <= self.page_size[0]:
+                    if best is None or shelf[1] < best[1][1]:
+                        best = (p, shelf)
+        if best is not None:
+            p, shelf = best
+            x = shelf[2]
+            shelf[2] += width
+            return p, x, shelf[0]
+        for p in range(len(self.pages)):
+            if self.tops[p] + height <= self.page_size[1]:
+                break
+        else:
+            p = self._new_page()
+        y = self.tops[p]
+        self.shelves[p].append([y, height, width])
+        self.tops[p] += height
+        return p, 0, y
+
+    def add(self, surface: Surface) -> Surface:
+        """Copy surface into the atlas and return its subsurface, or surface itself when it is too large.
+        Colour keyed pixels end up transparent, so the subsurface needs no colour key"""
+        width, height = surface.get_size()
+        if width > self.max_size or height > self.max_size or not width or not height:
+            return surface
+        p, x, y = self._place(width, height)
+        page = self.pages[p]
+        area = Rect(x, y, width, height)
+        page.blit(surface, area)
+        self.packed += 1
+        self.packed_area += width * height
+        return page.subsurface(area)
+
+    def add_many(self, surfaces: list[Surface]) -> list[Surface]:
+        """add for a batch, packed tallest first so shelves fill up better"""
+        order = sorted(range(len(surfaces)), key=lambda i: -surfaces[i].get_height())
+        packed = [None] * len(surfaces)
+        for i in order:
+            packed[i] = self.add(surfaces[i])
+        return packed
+
+    def memory(self) -> int:
+        """Pixel bytes of every page"""
+        return sum(page.get_pitch() * page.get_height() for page in self.pages)
+
+    def usage(self) -> float:
+        """Share of the page area taken by packed images"""
+        if not self.pages:
+            return 0.0
+        return self.packed_area / (len(self.pages) * self.page_size[0] * self.page_size[1])
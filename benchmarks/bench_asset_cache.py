@@ -0,0 +1,65 @@
+""" Headless baked asset cache benchmark, run from the project root: python -m benchmarks.bench_asset_cache """
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+import pygame
+from PIL import Image
+from pygame import Surface
+import shared
+from asset_cache import AssetCache
+
+IMAGES = 500
+GIFS = 10
+GIF_FRAMES = 40
+SIZE = (128, 128)
+
+
+def write_assets(directory: str) -> tuple[list[str], list[str]]:
+    rng = random.Random(0)
+    images = []
+    for i in range(IMAGES):
+        image = Surface(SIZE, pygame.SRCALPHA)
+        image.fill([rng.randint(0, 255) for _ in range(4)])
+        for _ in range(20):
+            pygame.draw.circle(image, [rng.randint(0, 255) for _ in range(4)],
+                               (rng.randint(0, SIZE[0]), rng.randint(0, SIZE[1])), rng.randint(4, 40))
+        path = os.path.join(directory, f"asset_{i}.png")
+        pygame.image.save(image, path)
+        images.append(path)
+    gifs = []
+    for i in range(GIFS):
+        frames = [Image.new("RGB", SIZE, tuple(rng.randint(0, 255) for _ in range(3))) for _ in range(GIF_FRAMES)]
+        path = os.path.join(directory, f"anim_{i}.gif")
+        frames[0].save(path, save_all=True, append_images=frames[1:])
+        gifs.append(path)
+    return images, gifs
+
+
+def load_all(images: list[str], gifs: list[str]) -> float:
+    start = time.perf_counter()
+    for path in images:
+        shared.finish_image("", shared.decode_image(path))
+    for path in gifs:
+        shared.finish_gif("", shared.decode_gif(path))
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        images, gifs = write_assets(directory)
+        shared.asset_cache = AssetCache(os.path.join(directory, "cache"))
+        print(f"{IMAGES} images of {SIZE[0]}x{SIZE[1]}, {GIFS} gifs of {GIF_FRAMES} frames")
+        shared.asset_cache.enabled = False
+        print(f"no cache      {load_all(images, gifs) * 1e3:9.2f} ms")
+        shared.asset_cache.enabled = True
+        print(f"cold (bake)   {load_all(images, gifs) * 1e3:9.2f} ms")
+        print(f"warm          {load_all(images, gifs) * 1e3:9.2f} ms")
+        print(f"cache hits {shared.asset_cache.hits}, misses {shared.asset_cache.misses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+""" Headless texture atlas benchmark, run from the project root: python -m benchmarks.bench_atlas """
+import os
+import random
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+import pygame
+from pygame import Surface, Rect
+import shared
+from atlas import Atlas
+
+IMAGES = 400
+SPRITES = 10000
+FRAMES = 60
+
+
+def make_images(rng: random.Random) -> list[Surface]:
+    images = []
+    for _ in range(IMAGES):
+        size = (rng.choice((16, 24, 32, 48)), rng.choice((16, 24, 32, 48)))
+        image = Surface(size, pygame.SRCALPHA).convert_alpha()
+        image.fill([rng.randint(0, 255) for _ in range(4)])
+        pygame.draw.circle(image, [rng.randint(0, 255) for _ in range(4)], (size[0] // 2, size[1] // 2), 6)
+        images.append(image)
+    return images
+
+
+def draw_time(images: list[Surface], rng: random.Random) -> float:
+    size = shared.canvas.get_size()
+    entries = [(images[rng.randrange(IMAGES)], Rect(rng.randrange(size[0]), rng.randrange(size[1]), 0, 0))
+               for _ in range(SPRITES)]
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        shared.canvas.fblits(entries)
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    images = make_images(random.Random(0))
+    loose = sum(shared.surface_bytes(image) for image in images)
+    atlas = Atlas()
+    packed = atlas.add_many(images)
+    print(f"{IMAGES} small images, {SPRITES} sprites drawn with fblits")
+    print(f"separate surfaces  {loose / 1024:8.1f} KiB in {IMAGES} surfaces, "
+          f"{draw_time(images, random.Random(1)) * 1e3:6.2f} ms per frame")
+    print(f"atlas subsurfaces  {atlas.memory() / 1024:8.1f} KiB in {len(atlas.pages)} pages "
+          f"({atlas.usage():.0%} used), {draw_time(packed, random.Random(1)) * 1e3:6.2f} ms per frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+""" Headless grid background benchmark, run from the project root: python -m benchmarks.bench_chunk_cache """
+import os
+import random
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+from pygame import Surface
+import shared
+from chunk_cache import ChunkCache
+
+FRAMES = 240
+CELL_SIZE = 10
+COLUMNS = 60
+ROWS = 48
+CHANGES = 50
+SPEED = 50
+
+
+def build() -> tuple[list[list[Surface]], list[Surface]]:
+    rng = random.Random(0)
+    tiles = []
+    for _ in range(8):
+        tile = Surface((CELL_SIZE, CELL_SIZE)).convert()
+        tile.fill([rng.randint(0, 255) for _ in range(3)])
+        tiles.append(tile)
+    return [[rng.choice(tiles) for _ in range(ROWS)] for _ in range(COLUMNS * 4)], tiles
+
+
+def per_cell(grid, tiles, canvas: Surface) -> float:
+    """Blit every visible cell every frame like the old grid draw"""
+    rng = random.Random(1)
+    start = time.perf_counter()
+    offset = 0.0
+    for _ in range(FRAMES):
+        offset += SPEED / shared.fps
+        for _ in range(CHANGES):
+            grid[rng.randrange(len(grid))][rng.randrange(ROWS)] = rng.choice(tiles)
+        first = int(offset // CELL_SIZE)
+        shift = int(offset) % CELL_SIZE
+        canvas.fblits([(grid[(first + x) % len(grid)][y], (x * CELL_SIZE - shift, y * CELL_SIZE))
+                       for x in range(COLUMNS + 1) for y in range(ROWS)])
+    return (time.perf_counter() - start) / FRAMES
+
+
+def chunked(grid, tiles, canvas: Surface) -> tuple[float, ChunkCache]:
+    rng = random.Random(1)
+
+    def draw_cell(surface, x, y, rect):
+        if 0 <= y < ROWS:
+            surface.blit(grid[x % len(grid)][y], rect)
+
+    cache = ChunkCache(CELL_SIZE, draw_cell, max_chunks=32)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        cache.scroll(SPEED / shared.fps)
+        for _ in range(CHANGES):
+            x = rng.randrange(len(grid))
+            y = rng.randrange(ROWS)
+            grid[x][y] = rng.choice(tiles)
+            cache.mark_cell(x, y)
+        cache.draw(canvas)
+    return (time.perf_counter() - start) / FRAMES, cache
+
+
+def main():
+    canvas = Surface((COLUMNS * CELL_SIZE, ROWS * CELL_SIZE)).convert()
+    print(f"{COLUMNS}x{ROWS} cells scrolling, {CHANGES} cell changes per frame")
+    grid, tiles = build()
+    print(f"per cell blits  {per_cell(grid, tiles, canvas) * 1e3:8.3f} ms/frame")
+    grid, tiles = build()
+    duration, cache = chunked(grid, tiles, canvas)
+    print(f"chunk cache     {duration * 1e3:8.3f} ms/frame ({cache.rendered} chunks rendered)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+""" Headless streaming gif benchmark, run from the project root: python -m benchmarks.bench_gif_stream """
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+from PIL import Image
+import shared
+from gif_stream import GifStream
+
+FRAMES = 120
+SIZE = (320, 240)
+GAME_FPS = 60
+GIF_FPS = 30
+
+
+def write_gif(path: str):
+    frames = [Image.effect_noise(SIZE, 40 + i % 30).convert("RGB") for i in range(FRAMES)]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+
+
+def play(frames, indices: list[int]) -> tuple[float, float]:
+    """Mean and worst time to fetch a frame, fetched every game frame at GAME_FPS like GifAnimation does"""
+    times = []
+    for index in indices:
+        start = time.perf_counter()
+        frames[index]
+        took = time.perf_counter() - start
+        times.append(took)
+        time.sleep(max(0.0, 1 / GAME_FPS - took))
+    return sum(times) / len(times), max(times)
+
+
+def play_together(readers: list, indices: list[list[int]]) -> tuple[float, float]:
+    """Like play, with every reader fetching its own frame each game frame"""
+    times = []
+    for step in zip(*indices):
+        start = time.perf_counter()
+        for reader, index in zip(readers, step):
+            reader[index]
+        took = time.perf_counter() - start
+        times.append(took)
+        time.sleep(max(0.0, 1 / GAME_FPS - took))
+    return sum(times) / len(times), max(times)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "big.gif")
+        write_gif(path)
+        print(f"{FRAMES} frames at {GIF_FPS} fps of {SIZE[0]}x{SIZE[1]}, {FRAMES * SIZE[0] * SIZE[1] * 4 / 2 ** 20:.1f} MiB decoded")
+
+        start = time.perf_counter()
+        frames = shared.finish_gif("", shared.decode_gif_rgba(path))
+        print(f"full decode   {(time.perf_counter() - start) * 1e3:9.2f} ms up front, "
+              f"{sum(shared.surface_bytes(f) for f in frames) / 2 ** 20:7.1f} MiB held")
+        del frames
+
+        steps = [i * GIF_FPS // GAME_FPS for i in range(FRAMES * GAME_FPS // GIF_FPS)]
+        for name, indices in (("forward", steps), ("reverse", [FRAMES - 1 - i for i in steps])):
+            start = time.perf_counter()
+            stream = GifStream(path)
+            opened = time.perf_counter() - start
+            mean, worst = play(stream, indices)
+            print(f"stream {name} {opened * 1e3:9.2f} ms to open, {stream.memory() / 2 ** 20:7.1f} MiB held, "
+                  f"{mean * 1e3:.2f} ms mean / {worst * 1e3:.2f} ms worst per frame, "
+                  f"{stream.hits} hits, {stream.misses} misses ({stream.stale} stale), {stream.decoded} decodes")
+            stream.close()
+
+        # Two sprites on the same gif, half the animation apart, each through its own cursor
+        stream = GifStream(path)
+        cursors = [stream.cursor(), stream.cursor()]
+        mean, worst = play_together(cursors, [steps, [(i + FRAMES // 2) % FRAMES for i in steps]])
+        print(f"stream 2 cursors {stream.memory() / 2 ** 20:7.1f} MiB held, "
+              f"{mean * 1e3:.2f} ms mean / {worst * 1e3:.2f} ms worst per frame, "
+              f"{stream.hits} hits, {stream.misses} misses ({stream.stale} stale), {stream.decoded} decodes")
+        stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+""" Headless Level.draw culling benchmark, run from the project root: python -m benchmarks.bench_level_draw """
+import os
+import random
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+from pygame import Surface, Rect
+from pygame.sprite import Sprite
+import shared
+from level import Level, set_static
+
+FRAMES = 60
+WORLD = 40000
+SIZES = (1000, 10000, 100000)
+MOVING = 200
+
+
+def legacy_draw(lvl: Level, surface: Surface):
+    """The old filter over every sprite, kept for comparison"""
+    surface.fblits([(i.image, i.rect) for i in filter(lambda x: shared.screen_rect.colliderect(x.rect),
+                                                      lvl.sprites())])
+
+
+def build(size: int) -> tuple[Level, list[Sprite]]:
+    rng = random.Random(size)
+    image = Surface((16, 16))
+    lvl = Level()
+    sprites = []
+    for _ in range(size):
+        sprite = Sprite()
+        sprite.image = image
+        sprite.rect = Rect(rng.randint(0, WORLD), rng.randint(0, WORLD), 16, 16)
+        sprites.append(sprite)
+    lvl.add(*sprites)
+    for sprite in sprites[MOVING:]:
+        set_static(sprite)
+    return lvl, sprites[:MOVING]
+
+
+def measure(lvl: Level, moving: list[Sprite], draw) -> float:
+    canvas = Surface(shared.screen_size)
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        for sprite in moving:
+            sprite.rect.x = (sprite.rect.x + 3) % WORLD
+        shared.screen_rect.topleft = (frame * 5, frame * 5)
+        draw(lvl, canvas)
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    print(f"{'sprites':>8} {'filter ms':>10} {'spatial hash ms':>16}")
+    for size in SIZES:
+        lvl, moving = build(size)
+        legacy = measure(lvl, moving, legacy_draw)
+        culled = measure(lvl, moving, Level.draw)
+        print(f"{size:>8} {legacy * 1e3:>10.3f} {culled * 1e3:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+""" Headless mixer stress benchmark, run from the project root: python -m benchmarks.bench_mixer """
+import os
+import random
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+import numpy
+import pygame
+from pygame.mixer import Sound
+import shared
+from mixer import MixerManager
+
+REQUESTS_PER_SECOND = 1000
+SECONDS = 2
+FPS = 120
+
+
+def tone(seconds: float, pitch: float) -> Sound:
+    frequency, _, channels = pygame.mixer.get_init()
+    t = numpy.arange(int(frequency * seconds)) / frequency
+    wave = (numpy.sin(2 * numpy.pi * pitch * t) * 8000).astype(numpy.int16)
+    return Sound(buffer=numpy.repeat(wave[:, None], channels, axis=1).tobytes())
+
+
+def requests(sounds: list[Sound]) -> list[list[Sound]]:
+    """Sounds asked for on each frame, letter chimes most of the time"""
+    rng = random.Random(0)
+    per_frame = REQUESTS_PER_SECOND / FPS
+    frames = []
+    for f in range(SECONDS * FPS):
+        count = int((f + 1) * per_frame) - int(f * per_frame)
+        frames.append([sounds[0] if rng.random() < 0.7 else rng.choice(sounds[1:]) for _ in range(count)])
+    return frames
+
+
+def run(frames: list[list[Sound]], play) -> float:
+    """Seconds spent in play, frames paced in real time so sounds finish like they would in game"""
+    spent = 0.0
+    start = time.perf_counter()
+    for f, sounds in enumerate(frames):
+        begin = time.perf_counter()
+        for sound in sounds:
+            play(sound)
+        spent += time.perf_counter() - begin
+        time.sleep(max(0.0, start + (f + 1) / FPS - time.perf_counter()))
+    return spent
+
+
+def main():
+    if not pygame.mixer.get_init():
+        print("no mixer available")
+        return
+    sounds = [tone(0.15, 880)] + [tone(length, pitch) for length, pitch in ((0.3, 220), (0.6, 330), (1.0, 110))]
+    frames = requests(sounds)
+    total = sum(len(f) for f in frames)
+    print(f"{total} play requests over {SECONDS} s, {FPS} fps")
+
+    cut = [0]
+
+    def play_old(sound: Sound):
+        if sound.get_num_channels():
+            cut[0] += 1
+        sound.fadeout(0)
+        sound.set_volume(shared.volume)
+        sound.play()
+
+    spent = run(frames, play_old)
+    pygame.mixer.stop()
+    print(f"fadeout + set_volume  {spent / total * 1e6:7.2f} us per request, {3 * total} mixer calls, "
+          f"{cut[0]} sounds cut off by their next play")
+
+    manager = MixerManager({"effects": 12, "ui": 4})
+    manager.configure(sounds[0], "ui", priority=-1, max_voices=3)
+    for priority, sound in enumerate(sounds[1:]):
+        manager.configure(sound, "effects", priority=priority)
+    manager.set_volume(shared.volume)
+    spent = run(frames, lambda sound: manager.play(sound, sound))
+    pygame.mixer.stop()
+    print(f"mixer manager         {spent / total * 1e6:7.2f} us per request, "
+          f"{manager.plays + manager.volume_changes} mixer calls, {manager.plays} played, "
+          f"{manager.restarted} voice limited, {manager.stolen} stolen, {manager.dropped} dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+""" Headless physics profile benchmark, run from the project root: python -m benchmarks.bench_physics """
+import os
+import random
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+import pymunk
+from pymunk import Body, Circle, Poly, Segment
+import shared
+from level import Level, calibrate_spatial_hash
+
+BODIES = 3000
+WIDTH = 1600
+HEIGHT = 1200
+SETTLE = 400
+STEPS = 120
+PROFILE = {
+    "iterations": 6,
+    "sleep_time_threshold": 0.5,
+    "idle_speed_threshold": 5,
+    "collision_slop": 0.5
+}
+
+
+def build(profile: dict = None) -> Level:
+    rng = random.Random(0)
+    lvl = Level(physics_profile=profile or {})
+    space = lvl.space
+    walls = space.static_body
+    for a, b in (((0, 0), (WIDTH, 0)), ((0, 0), (0, HEIGHT)), ((WIDTH, 0), (WIDTH, HEIGHT))):
+        space.add(Segment(walls, a, b, 5))
+    for i in range(BODIES):
+        size = rng.uniform(8, 16)
+        body = Body(1, pymunk.moment_for_circle(1, 0, size))
+        body.position = (rng.uniform(20, WIDTH - 20), rng.uniform(20, HEIGHT * 3))
+        shape = Circle(body, size) if i % 2 else Poly.create_box(body, (size * 2, size * 2))
+        shape.friction = 0.7
+        space.add(body, shape)
+    return lvl
+
+
+def measure(lvl: Level) -> float:
+    for _ in range(SETTLE):
+        lvl.space.step(shared.physics_step)
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        lvl.space.step(shared.physics_step)
+    return (time.perf_counter() - start) / STEPS
+
+
+def main():
+    print(f"{BODIES} bodies, {STEPS} steps after {SETTLE} settling steps")
+    print(f"default space         {measure(build()) * 1e3:8.3f} ms/step")
+    print(f"profile {PROFILE}")
+    print(f"profile               {measure(build(PROFILE)) * 1e3:8.3f} ms/step")
+    lvl = build(PROFILE)
+    for _ in range(SETTLE):
+        lvl.space.step(shared.physics_step)
+    print(f"{'dim':>8} {'count':>8} {'ms/step':>10}")
+    for dim, count, seconds in calibrate_spatial_hash(lvl.space)[:5]:
+        print(f"{dim or 'bb tree':>8} {count:>8} {seconds * 1e3:>10.3f}")
+    spatial_hash = lvl.calibrate_physics()
+    print(f"profile + calibrated  {measure(lvl) * 1e3:8.3f} ms/step (spatial hash {spatial_hash})")
+
+
+if __name__ == "__main__":
+    main()
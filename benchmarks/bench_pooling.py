@@ -0,0 +1,80 @@
+""" Headless GC pause benchmark for bullet spawning, run from the project root: python -m benchmarks.bench_pooling """
+import gc
+import os
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+from pygame import Vector2, Rect
+from pygame.sprite import Sprite, Group
+import shared
+from task_manager import (scheduler, task_pool, LerpPositionLine, DestroySpritePosition, LerpPositionLinePooled,
+                          DestroySpritePositionPooled, TT_TASK)
+
+FRAMES = 2000
+SPAWN_PER_FRAME = 20
+
+
+class GcStats(object):
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.pause = [0.0, 0.0, 0.0]
+        self.worst = [0.0, 0.0, 0.0]
+        self._start = 0.0
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+            return
+        gen = info["generation"]
+        pause = time.perf_counter() - self._start
+        self.collections[gen] += 1
+        self.pause[gen] += pause
+        self.worst[gen] = max(self.worst[gen], pause)
+
+
+def run(pooled: bool) -> tuple[GcStats, float]:
+    group = Group()
+    bullets = [Sprite() for _ in range(SPAWN_PER_FRAME * 32)]
+    for bullet in bullets:
+        bullet.rect = Rect(0, 0, 4, 4)
+    start_pos = Vector2(0, 0)
+    end_pos = Vector2(150, 80)
+    next_bullet = 0
+    gc.collect()
+    stats = GcStats()
+    gc.callbacks.append(stats)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        for _ in range(SPAWN_PER_FRAME):
+            bullet = bullets[next_bullet]
+            next_bullet = (next_bullet + 1) % len(bullets)
+            bullet.rect.center = start_pos
+            group.add(bullet)
+            if pooled:
+                task_pool.acquire(LerpPositionLinePooled, bullet, start_pos, end_pos, 1200).start()
+                task_pool.acquire(DestroySpritePositionPooled, bullet, end_pos, 12).start()
+            else:
+                LerpPositionLine(bullet, start_pos, end_pos, 1200).start()
+                DestroySpritePosition(bullet, end_pos, 12).start()
+        scheduler.run(TT_TASK)
+    elapsed = time.perf_counter() - start
+    gc.callbacks.remove(stats)
+    group.empty()
+    scheduler.run(TT_TASK)
+    return stats, elapsed
+
+
+def main():
+    shared.delta_time = 1 / 120
+    print(f"{FRAMES} frames, {SPAWN_PER_FRAME} bullets per frame")
+    print(f"{'':>8} {'ms/frame':>9} {'gen0':>6} {'gen1':>6} {'gen2':>6} {'gc ms':>8} {'gen2 worst ms':>14}")
+    for name, pooled in (("classic", False), ("pooled", True)):
+        stats, elapsed = run(pooled)
+        print(f"{name:>8} {elapsed / FRAMES * 1e3:>9.3f} {stats.collections[0]:>6} {stats.collections[1]:>6} "
+              f"{stats.collections[2]:>6} {sum(stats.pause) * 1e3:>8.2f} {stats.worst[2] * 1e3:>14.3f}")
+    print(f"pool created {task_pool.created}, reused {task_pool.reused}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+""" Headless Level.draw allocation benchmark, run from the project root: python -m benchmarks.bench_render_list """
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+from pygame import Surface, Rect
+from pygame.sprite import Sprite
+import shared
+from level import Level, set_static
+
+FRAMES = 240
+SPRITES = 2000
+MOVING = 200
+
+
+def rebuild_draw(lvl: Level, surface: Surface):
+    """The per frame sorted query and tuple list, kept for comparison"""
+    lvl.refresh_index()
+    surface.fblits([(i.image, i.rect) for i in lvl.query(shared.screen_rect)])
+
+
+def build() -> tuple[Level, list[Sprite]]:
+    rng = random.Random(0)
+    image = Surface((16, 16))
+    lvl = Level()
+    sprites = []
+    for _ in range(SPRITES):
+        sprite = Sprite()
+        sprite.image = image
+        sprite.rect = Rect(rng.randint(0, int(shared.screen_size.x)), rng.randint(0, int(shared.screen_size.y)), 16, 16)
+        sprites.append(sprite)
+    lvl.add(*sprites)
+    for sprite in sprites[MOVING:]:
+        set_static(sprite)
+    return lvl, sprites[:MOVING]
+
+
+def measure(draw) -> tuple[float, float]:
+    """Seconds and peak bytes allocated per frame"""
+    lvl, moving = build()
+    canvas = Surface(shared.screen_size)
+    shared.screen_rect.topleft = (0, 0)
+    draw(lvl, canvas)
+    duration = 0.0
+    peak = 0
+    tracemalloc.start()
+    for frame in range(FRAMES):
+        offset = 1 if frame % 2 else -1
+        for sprite in moving:
+            sprite.rect.x += offset
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        draw(lvl, canvas)
+        duration += time.perf_counter() - start
+        peak += tracemalloc.get_traced_memory()[1] - tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return duration / FRAMES, peak / FRAMES
+
+
+def main():
+    print(f"{SPRITES} sprites on screen, {MOVING} moving (times include tracemalloc overhead)")
+    for name, draw in (("rebuilt list", rebuild_draw), ("persistent list", Level.draw)):
+        duration, peak = measure(draw)
+        print(f"{name:<16} {duration * 1e3:8.3f} ms/frame {peak / 1024:10.1f} KiB allocated/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+""" Headless scheduler benchmark, run from the project root: python -m benchmarks.bench_scheduler """
+import gc
+import os
+import random
+import statistics
+import time
+from typing import Callable
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+from task_manager import Task, Scheduler, TT_TASK
+
+FRAMES = 60
+WARMUP = 10
+REPEATS = 3
+SIZES = (100, 1000, 10000, 50000)
+
+
+def legacy_run(tasks: list[Task]):
+    """The old enumerate/del loop, kept for comparison"""
+    for i, task in enumerate(tasks):
+        if task.execute() == Task.end:
+            del tasks[i]
+
+
+def populate(sched: Scheduler, size: int, executed: list[int], churn: bool):
+    """Fill a bucket with short-lived tasks that start again on end, the same Task object so both loops run the
+    same work without allocating. Without churn the tasks never end. executed counts the calls, the old loop
+    skips the task after each delete so frames alone don't compare"""
+    rng = random.Random(size)
+
+    def effect(task, life):
+        executed[0] += 1
+        life[0] -= 1
+        if life[0] <= 0:
+            life[0] = life[1]
+            sched.add(task)
+            return task.end
+        return task.cont
+
+    for _ in range(size):
+        life = rng.randint(2, 30) if churn else FRAMES * 2
+        sched.add(Task(effect, ([[life, life]], {})))
+    if not churn:
+        # Tasks that start again go to the back, so after a few frames the list no longer runs in allocation order.
+        # The steady list is shuffled the same way, or it would be faster from cache hits alone once it is large
+        rng.shuffle(sched.tasks[TT_TASK])
+
+
+def measure(size: int, runners: list[tuple[Callable[[Scheduler], None], bool]]) -> list[tuple[float, float]]:
+    """Median frame time and median time per executed task of each (runner, churn), over REPEATS runs of FRAMES
+    after WARMUP frames. The runners take turns frame by frame and medians are used, so a stretch where the OS takes
+    the CPU away lands on all of them or none. The garbage collector is held off while timing, a full collection
+    walks every live task and would land on whichever loop it hit"""
+    frames = [[] for _ in runners]
+    per_task = [[] for _ in runners]
+    for _ in range(REPEATS):
+        scheds = []
+        for runner, churn in runners:
+            sched = Scheduler()
+            executed = [0]
+            populate(sched, size, executed, churn)
+            for _ in range(WARMUP):
+                runner(sched)
+            scheds.append((sched, executed))
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(FRAMES):
+                for i, (runner, _) in enumerate(runners):
+                    sched, executed = scheds[i]
+                    executed[0] = 0
+                    start = time.perf_counter()
+                    runner(sched)
+                    seconds = time.perf_counter() - start
+                    frames[i].append(seconds)
+                    per_task[i].append(seconds / executed[0])
+        finally:
+            gc.enable()
+    return [(statistics.median(f), statistics.median(t)) for f, t in zip(frames, per_task)]
+
+
+def compact_run(sched: Scheduler):
+    sched.run(TT_TASK)
+
+
+def main():
+    # A task ends about every 15 frames. The removal columns are the cost per executed task on top of the same
+    # tasks never ending, the part that tells the two loops apart. Steady grows a little with size from the memory
+    # the tasks take, both loops pay that
+    print(f"{'tasks':>8} {'steady ns':>10} {'compact ms':>11} {'removal ns':>11} {'legacy ms':>10} {'removal ns':>11}")
+    for size in SIZES:
+        (_, steady), (compact, compact_each), (legacy, legacy_each) = measure(size, [
+            (compact_run, False), (compact_run, True), (lambda sched: legacy_run(sched.tasks[TT_TASK]), True)])
+        print(f"{size:>8} {steady * 1e9:>10.0f} {compact * 1e3:>11.3f} {(compact_each - steady) * 1e9:>11.0f} "
+              f"{legacy * 1e3:>10.3f} {(legacy_each - steady) * 1e9:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+""" Headless Sequencer benchmark, run from the project root: python -m benchmarks.bench_sequencer """
+import os
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+from task_manager import Task, Sequencer, TickWait, TT_TASK, scheduler
+
+FRAMES = 100
+SEQUENCES = 1000
+STEPS = (5, 20, 80)
+
+
+def step(task):
+    return task.cont
+
+
+def measure(steps: int, parallel: bool) -> float:
+    scheduler.tasks[TT_TASK].clear()
+    scheduler.tick_timers.clear()
+    for _ in range(SEQUENCES):
+        seq_tasks = [TickWait(2) if i % 4 == 3 else Task(step) for i in range(steps)]
+        inner = Sequencer(*seq_tasks).build(parallel=parallel, nested=True)
+        scheduler.add(Sequencer(inner).build(looping=True), TT_TASK)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        scheduler.advance(1 / 120)
+        scheduler.run(TT_TASK)
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    print(f"{SEQUENCES} looping sequences")
+    print(f"{'steps':>6} {'sequential ms/frame':>20} {'parallel ms/frame':>18}")
+    for steps in STEPS:
+        print(f"{steps:>6} {measure(steps, False) * 1e3:>20.3f} {measure(steps, True) * 1e3:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+""" Headless shared image memory benchmark, run from the project root: python -m benchmarks.bench_shared_assets """
+import os
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+import shared
+from game_object import GameObject
+
+SPRITES = 10000
+
+
+def held_bytes(sprites: list[GameObject]) -> int:
+    """Pixel bytes of the distinct surfaces the sprites hold"""
+    surfaces = {}
+    for sprite in sprites:
+        surfaces[id(sprite.image)] = sprite.image
+        surfaces[id(sprite.original_image)] = sprite.original_image
+    return sum(shared.surface_bytes(s) for s in surfaces.values())
+
+
+def build(copy: bool) -> tuple[list[GameObject], float]:
+    start = time.perf_counter()
+    sprites = []
+    for i in range(SPRITES):
+        sprite = GameObject(image="fsh", position=(i % 100, i // 100))
+        if copy:
+            # What every GameObject used to get, a private image and original
+            sprite.image = sprite.image.copy()
+            sprite.original_image = sprite.image.copy()
+        sprites.append(sprite)
+    return sprites, time.perf_counter() - start
+
+
+def main():
+    size = shared.get_image("fsh")[0].get_size()
+    print(f"{SPRITES} game objects sharing one {size[0]}x{size[1]} image")
+    for name, copy in (("copy per sprite", True), ("shared handle", False)):
+        sprites, seconds = build(copy)
+        print(f"{name:<16} {held_bytes(sprites) / 2 ** 20:10.2f} MiB {seconds * 1e3:10.2f} ms to create")
+    print("registries " + ", ".join(f"{k} {v / 2 ** 20:.2f} MiB" for k, v in shared.asset_memory().items()))
+
+
+if __name__ == "__main__":
+    main()
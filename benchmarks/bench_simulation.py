@@ -0,0 +1,43 @@
+""" Headless batch simulation benchmark, run from the project root: python -m benchmarks.bench_simulation """
+import os
+import random
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+import pymunk
+from pymunk import Body, Circle, Segment
+import simulation
+
+LEVELS = 8
+BODIES = 300
+STEPS = 600
+
+
+def setup(level, seed: int):
+    rng = random.Random(seed)
+    space = level.space
+    for a, b in (((0, 0), (800, 0)), ((0, 0), (0, 2000)), ((800, 0), (800, 2000))):
+        space.add(Segment(space.static_body, a, b, 5))
+    for _ in range(BODIES):
+        body = Body(1, pymunk.moment_for_circle(1, 0, 8))
+        body.position = (rng.uniform(20, 780), rng.uniform(20, 2000))
+        space.add(body, Circle(body, 8))
+
+
+def main():
+    seeds = [(seed,) for seed in range(LEVELS)]
+    print(f"{LEVELS} levels of {BODIES} bodies, {STEPS} steps each, {os.cpu_count()} cores")
+    start = time.perf_counter()
+    serial = [simulation.simulate(setup, STEPS, args=args) for args in seeds]
+    print(f"one process   {time.perf_counter() - start:8.3f} s")
+    simulation.run_simulations(setup, 1, seeds[:1])
+    start = time.perf_counter()
+    pooled = simulation.run_simulations(setup, STEPS, seeds)
+    print(f"process pool  {time.perf_counter() - start:8.3f} s (after pool start up)")
+    simulation.shutdown_simulation_pool()
+    print(f"same results  {[r['mean_speed'] for r in serial] == [r['mean_speed'] for r in pooled]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+""" Headless asset startup benchmark, run from the project root: python -m benchmarks.bench_startup """
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+import pygame
+from pygame import Surface
+import shared
+from registry import LazyRegistry
+
+ASSETS = 500
+SIZE = (128, 128)
+USED = 20
+
+
+def write_assets(directory: str) -> list[str]:
+    rng = random.Random(0)
+    names = []
+    for i in range(ASSETS):
+        image = Surface(SIZE, pygame.SRCALPHA)
+        image.fill([rng.randint(0, 255) for _ in range(4)])
+        for _ in range(20):
+            pygame.draw.circle(image, [rng.randint(0, 255) for _ in range(4)],
+                               (rng.randint(0, SIZE[0]), rng.randint(0, SIZE[1])), rng.randint(4, 40))
+        name = f"asset_{i}.png"
+        pygame.image.save(image, os.path.join(directory, name))
+        names.append(name)
+    return names
+
+
+def eager(directory: str, names: list[str]) -> dict:
+    """The old load_image loop, decode and convert everything up front"""
+    registry = {}
+    for name in names:
+        img = pygame.image.load(os.path.join(directory, name)).convert_alpha()
+        size = img.get_size()
+        img = pygame.transform.scale(img, (size[0], size[1]))
+        registry[name.split('.')[0]] = (img, img.get_rect())
+    return registry
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        names = write_assets(directory)
+        used = [name.split('.')[0] for name in names[:USED]]
+        print(f"{ASSETS} images of {SIZE[0]}x{SIZE[1]}, {USED} used right after startup")
+
+        start = time.perf_counter()
+        eager(directory, names)
+        print(f"eager load            {(time.perf_counter() - start) * 1e3:9.2f} ms")
+
+        registry = LazyRegistry(pygame.image.load, shared.finish_image)
+        start = time.perf_counter()
+        registry.index(directory, names)
+        indexed = time.perf_counter() - start
+        for key in used:
+            registry.get(key)
+        print(f"lazy index            {indexed * 1e3:9.2f} ms")
+        print(f"lazy index + {USED} used {(time.perf_counter() - start) * 1e3:9.2f} ms")
+
+        registry = LazyRegistry(pygame.image.load, shared.finish_image)
+        start = time.perf_counter()
+        registry.index(directory, names)
+        thread = registry.warm(used)
+        for key in used:
+            registry.get(key)
+        ready = time.perf_counter() - start
+        thread.join()
+        for key in registry.keys():
+            registry.get(key)
+        print(f"warm thread, {USED} used {ready * 1e3:9.2f} ms ({(time.perf_counter() - start) * 1e3:.2f} ms until all "
+              f"{registry.loaded()} are ready)")
+
+
+if __name__ == "__main__":
+    main()
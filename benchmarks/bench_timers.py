@@ -0,0 +1,50 @@
+""" Headless sleeping task benchmark, run from the project root: python -m benchmarks.bench_timers """
+import os
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+from task_manager import Task, Scheduler, TimeWait, TT_TASK
+
+FRAMES = 120
+DELTA_TIME = 1 / 120
+SIZES = (100, 1000, 10000)
+
+
+def counting_wait(wait_time: float) -> Task:
+    """The old per frame counting TimeWait, kept for comparison"""
+    counter = [0]
+
+    def update(task):
+        counter[0] += DELTA_TIME
+        if wait_time <= counter[0]:
+            counter[0] = 0
+            return task.cont
+        return task.wait
+    return Task(update)
+
+
+def measure(size: int, make_task) -> float:
+    sched = Scheduler()
+    for _ in range(size):
+        sched.add(make_task(60.0), TT_TASK)
+    # First frame parks every delay
+    sched.advance(DELTA_TIME)
+    sched.run(TT_TASK)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        sched.advance(DELTA_TIME)
+        sched.run(TT_TASK)
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    print(f"{'delays':>8} {'parked us/frame':>16} {'counting us/frame':>18}")
+    for size in SIZES:
+        parked = measure(size, TimeWait)
+        counting = measure(size, counting_wait)
+        print(f"{size:>8} {parked * 1e6:>16.1f} {counting * 1e6:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
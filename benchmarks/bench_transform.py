@@ -0,0 +1,36 @@
+""" Headless rotation benchmark, run from the project root: python -m benchmarks.bench_transform """
+import os
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+import shared
+import util
+
+FRAMES = 240
+SPRITES = 500
+
+
+def measure(rotate) -> float:
+    image = shared.get_image("fsh")[0]
+    angles = [i * 7.3 for i in range(SPRITES)]
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        for i in range(SPRITES):
+            angles[i] = (angles[i] + 100 * (1 / 120)) % 360
+            rotate(image, angles[i], (0, 0))
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    size = shared.get_image("fsh")[0].get_size()
+    print(f"{SPRITES} sprites spinning one {size[0]}x{size[1]} image")
+    print(f"rotate_image         {measure(util.rotate_image) * 1e3:8.3f} ms/frame")
+    print(f"rotate_image_cached  {measure(util.rotate_image_cached) * 1e3:8.3f} ms/frame")
+    cache = util.transform_cache
+    print(f"cache {len(cache.entries)} entries, {cache.bytes / 2 ** 20:.1f} MiB, "
+          f"{cache.hits} hits, {cache.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
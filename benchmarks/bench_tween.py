@@ -0,0 +1,65 @@
+""" Headless tween benchmark, run from the project root: python -m benchmarks.bench_tween """
+import os
+import random
+import time
+
+os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+from pygame import Vector2, Rect
+from pygame.sprite import Sprite, Group
+import shared
+from task_manager import scheduler, LerpPosition, FloatMovement, TT_TASK
+from tween import tween_system
+
+FRAMES = 120
+SPRITES = 5000
+
+
+def make_sprites(group: Group) -> list[Sprite]:
+    rng = random.Random(1)
+    sprites = []
+    for _ in range(SPRITES):
+        sprite = Sprite(group)
+        sprite.rect = Rect(rng.randint(0, 4000), rng.randint(0, 4000), 8, 8)
+        sprites.append(sprite)
+    return sprites
+
+
+def run_frames() -> float:
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        scheduler.run(TT_TASK)
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    shared.delta_time = 1 / 120
+    target = Vector2(2000, 2000)
+    half = SPRITES // 2
+
+    group = Group()
+    sprites = make_sprites(group)
+    for sprite in sprites[:half]:
+        LerpPosition(sprite, target, move_speed=5).start()
+    for sprite in sprites[half:]:
+        FloatMovement(sprite).start()
+    # LerpPosition and FloatMovement run on the tween system too, this is what their per sprite task adds
+    tasks = run_frames()
+    group.empty()
+    scheduler.run(TT_TASK)
+
+    group = Group()
+    sprites = make_sprites(group)
+    for sprite in sprites[:half]:
+        tween_system.lerp_position(sprite, target, move_speed=5)
+    for sprite in sprites[half:]:
+        tween_system.float_movement(sprite)
+    vectorized = run_frames()
+
+    print(f"{SPRITES} sprites, half lerp and half float")
+    print(f"tween tasks    {tasks * 1e3:8.3f} ms/frame")
+    print(f"tween system   {vectorized * 1e3:8.3f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,8 @@ import pygame
 from pygame import Vector2
 
 import shared
-from level import level
+from chunk_cache import ChunkCache
+from level import current_level
 from playercontroller import PlayerController
 from task_manager import Task, Sequencer, TT_DRAW
 
@@ -188,20 +189,25 @@ def update_particles(task):
 
             funcs[cell.cell_type](new_grid_map, new_active, pd)
 
+    for pos in active_cells | new_active:
+        if grid_map.get(pos) is not new_grid_map.get(pos):
+            grid_cache.mark_cell(*pos)
     grid_map = new_grid_map
     active_cells = new_active
 
 
+def draw_cell(surface, x, y, rect):
+    if (cell := grid_map.get((x, y))) is not None:
+        surface.fill(COLORS[cell.cell_type], rect)
+
+
+grid_cache = ChunkCache(GRID_SIZE, draw_cell, fill=COLORS[EMPTY])
+
+
 def draw_grid(task):
-    """ Draws the grid using pygame. """
-    for i in range(GRID_WIDTH * GRID_HEIGHT):
-        x = i // GRID_HEIGHT
-        y = i % GRID_HEIGHT
-        color = (0, 0, 0)
-        if (x, y) in grid_map:
-            g_pos = grid_map[(x, y)]
-            color = COLORS[g_pos.cell_type]
-        pygame.draw.rect(shared.canvas, color, (x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE))
+    """ Draws the grid from the chunk cache, only changed cells are drawn again. """
+    for rect in grid_cache.draw(shared.canvas):
+        shared.mark_dirty(rect)
     return task.cont
 
 
@@ -209,10 +215,12 @@ def spawn_particle(x, y, particle_type):
     if 0 <= x < GRID_WIDTH and 0 < y < GRID_HEIGHT and (x, y) not in grid_map:
         grid_map[(x, y)] = Cell(particle_type)
         active_cells.add((x, y))
+        grid_cache.mark_cell(x, y)
 
 
 def init():
     mouse = PlayerController()
+    level = current_level()
     level.add(mouse)
     can_click = [True]
 
@@ -220,11 +228,11 @@ def init():
         if mouse.alive():
             if can_click[0]:
                 mx, my = shared.get_mouse_pos()
-                if pygame.mouse.get_pressed()[0]:  # Left click = sand
+                if shared.mouse_buttons[0]:  # Left click = sand
                     spawn_particle(mx // GRID_SIZE, my // GRID_SIZE, SAND)
-                if pygame.mouse.get_pressed()[1]:  # Middle click = water
+                if shared.mouse_buttons[1]:  # Middle click = water
                     spawn_particle(mx // GRID_SIZE, my // GRID_SIZE, WATER)
-                if pygame.mouse.get_pressed()[2]:  # Right click = gas
+                if shared.mouse_buttons[2]:  # Right click = gas
                     spawn_particle(mx // GRID_SIZE, my // GRID_SIZE, GAS)
             can_click[0] = not can_click[0]
             return task.cont
@@ -0,0 +1,112 @@
+from typing import Callable
+from pygame import Surface, Rect, Vector2
+
+
+class ChunkCache(object):
+    def __init__(self, cell_size: int, draw_cell: Callable[[Surface, int, int, Rect], None], chunk_cells: int = 16,
+                 fill="black", max_chunks: int = 0):
+        """Grid background cached as surfaces of chunk_cells x chunk_cells cells.
+        draw_cell(surface, x, y, rect) paints cell x, y into rect of its chunk, it is only called when a chunk is
+        first rendered and for cells marked with mark_cell. With max_chunks set, chunks off screen are dropped once
+        there are more than that"""
+        self.cell_size = cell_size
+        self.chunk_cells = chunk_cells
+        self.chunk_size = cell_size * chunk_cells
+        self.draw_cell = draw_cell
+        self.fill = fill
+        self.max_chunks = max_chunks
+        self.chunks: dict[tuple[int, int], Surface] = {}
+        self.dirty: dict[tuple[int, int], set[tuple[int, int]]] = {}
+        self.offset = Vector2(0, 0)
+        self.last_offset = None
+        self.rendered = 0
+
+    def mark_cell(self, x: int, y: int):
+        """Render a cell again on the next draw"""
+        key = (x // self.chunk_cells, y // self.chunk_cells)
+        if key in self.chunks:
+            if (cells := self.dirty.get(key)) is None:
+                cells = self.dirty[key] = set()
+            cells.add((x, y))
+
+    def mark_cells(self, cells):
+        for x, y in cells:
+            self.mark_cell(x, y)
+
+    def invalidate(self):
+        """Drop every chunk, e.g. after the cell size or the whole grid changed"""
+        self.chunks.clear()
+        self.dirty.clear()
+        self.last_offset = None
+
+    def scroll(self, dx: float, dy: float = 0):
+        self.offset.x += dx
+        self.offset.y += dy
+
+    def _cell_rect(self, key: tuple[int, int], x: int, y: int) -> Rect:
+        n = self.chunk_cells
+        cs = self.cell_size
+        return Rect((x - key[0] * n) * cs, (y - key[1] * n) * cs, cs, cs)
+
+    def _render_chunk(self, key: tuple[int, int]) -> Surface:
+        chunk = Surface((self.chunk_size, self.chunk_size)).convert()
+        if self.fill is not None:
+            chunk.fill(self.fill)
+        n = self.chunk_cells
+        cs = self.cell_size
+        draw_cell = self.draw_cell
+        x0 = key[0] * n
+        y0 = key[1] * n
+        for i in range(n):
+            for j in range(n):
+                draw_cell(chunk, x0 + i, y0 + j, Rect(i * cs, j * cs, cs, cs))
+        self.chunks[key] = chunk
+        self.dirty.pop(key, None)
+        self.rendered += 1
+        return chunk
+
+    def _render_cells(self, key: tuple[int, int], cells: set[tuple[int, int]]) -> list[Rect]:
+        chunk = self.chunks[key]
+        fill = self.fill
+        draw_cell = self.draw_cell
+        rects = []
+        for x, y in cells:
+            rect = self._cell_rect(key, x, y)
+            if fill is not None:
+                chunk.fill(fill, rect)
+            draw_cell(chunk, x, y, rect)
+            rects.append(rect)
+        return rects
+
+    def draw(self, surface: Surface) -> list[Rect]:
+        """Cover surface with the chunks visible at the scroll offset, returns the rects of surface that changed"""
+        size = self.chunk_size
+        ox = round(self.offset.x)
+        oy = round(self.offset.y)
+        view = surface.get_rect()
+        scrolled = self.last_offset != (ox, oy)
+        self.last_offset = (ox, oy)
+        changed = [view] if scrolled else []
+        chunks = self.chunks
+        blits = []
+        visible = set()
+        for cx in range((ox // size), (ox + view.w - 1) // size + 1):
+            for cy in range((oy // size), (oy + view.h - 1) // size + 1):
+                key = (cx, cy)
+                visible.add(key)
+                pos = (cx * size - ox, cy * size - oy)
+                if (chunk := chunks.get(key)) is None:
+                    chunk = self._render_chunk(key)
+                    if not scrolled:
+                        changed.append(Rect(pos, chunk.get_size()).clip(view))
+                elif cells := self.dirty.pop(key, None):
+                    rects = self._render_cells(key, cells)
+                    if not scrolled:
+                        changed.extend(rect.move(pos) for rect in rects)
+                blits.append((chunk, pos))
+        surface.fblits(blits)
+        if self.max_chunks and self.max_chunks < len(chunks):
+            for key in [key for key in chunks if key not in visible]:
+                del chunks[key]
+                self.dirty.pop(key, None)
+        return changed
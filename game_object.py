@@ -1,13 +1,12 @@
 import math
 from typing import Callable, Sequence
-import pygame
 import pymunk
 from pymunk import Body, Shape, Constraint
 import shared
 from pygame import Surface, Vector2, Rect
 from pygame.sprite import Sprite
 import util
-from level import level
+from level import Level, current_level
 
 
 def spawn_bounds():
@@ -37,8 +36,9 @@ def spawn_bounds():
             "body_type": util.BODY_TYPE_STATIC
         }
     ]
+    lvl = current_level()
     for w in walls:
-        level.add(PhysicsBox(**w))
+        lvl.add(PhysicsBox(**w))
 
 
 class GameObject(Sprite):
@@ -57,7 +57,7 @@ class GameObject(Sprite):
         else:
             self.image, self.rect = shared.get_image("", **kwargs)
         self.rect.center = kwargs.get("position", (0, 0))
-        self.original_image = self.image.copy()
+        self.original_image = self.image
         self.body: Body = None
         self.shapes: list[Shape] = []
         self.constraints: list[Constraint] = []
@@ -86,8 +86,10 @@ class GameObject(Sprite):
         pass
 
     def kill(self):
+        for group in self.groups():
+            if isinstance(group, Level):
+                group.remove(self)
         super().kill()
-        level.remove(self)
         self.image = None
         self.rect = None
         self.original_image = None
@@ -112,7 +114,7 @@ def spawn_game_object(name: str, position: Sequence[float] = (0, 0)) -> GameObje
             **params
         }
         o = c(**p)
-        level.add(o)
+        current_level().add(o)
     return o
 
 
@@ -126,8 +128,15 @@ class SimplePhysicsObject(GameObject):
     
     def update(self, *args, **kwargs):
         super().update(*args, **kwargs)
-        center = util.flip_y(self.body.position)
-        self.image = pygame.transform.rotate(self.original_image, math.degrees(self.body.angle))
+        body = self.body
+        position = body.position
+        angle = body.angle
+        alpha = shared.physics_alpha
+        if alpha < 1 and (previous := getattr(body, "previous_position", None)) is not None:
+            position = previous.interpolate_to(position, alpha)
+            angle = body.previous_angle + (angle - body.previous_angle) * alpha
+        center = util.flip_y(position)
+        self.image = util.transform_cache.rotate(self.original_image, math.degrees(angle))
         self.rect = self.image.get_rect(center=center)
 
 
@@ -0,0 +1,219 @@
+import sys
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, Future
+import pygame
+from PIL import Image
+from pygame import Surface
+
+_pool: ThreadPoolExecutor = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(1, thread_name_prefix="gif_stream")
+    return _pool
+
+
+class GifStream(object):
+    def __init__(self, path: str, cache_frames: int = 16, read_ahead: int = 4, background: bool = True,
+                 color_key=(255, 255, 255, 255), length: int = None):
+        """Frames of a gif decoded when they are asked for, indexable like the frame list from shared.get_gif.
+        Each reader plays through its own GifCursor from cursor(), indexing the stream itself goes through one
+        cursor shared by everyone. Cursors share the decoded frames, at most cache_frames per live cursor, the ones
+        furthest behind every cursor go first. Counting the frames reads the whole file, pass length when it is known"""
+        self.path = path
+        with Image.open(path) as image:
+            self.length = getattr(image, "n_frames", 1) if length is None else length
+            self.size = image.size
+        self.cache_frames = max(cache_frames, read_ahead + 1, 2)
+        self.read_ahead = read_ahead
+        self.background = background and sys.platform != "emscripten"
+        self.color_key = color_key
+        # Frame index to its Surface, or its RGBA bytes while only the worker has decoded it
+        self.frames: dict[int, Surface | bytes] = {}
+        self.lock = threading.Lock()
+        self.cursors: weakref.WeakSet[GifCursor] = weakref.WeakSet()
+        self.reader: GifCursor = None
+        self.empty: Surface = None
+        self.hits = 0
+        self.misses = 0
+        # Misses answered with the nearest cached frame while the worker decodes the one asked for
+        self.stale = 0
+        self.decoded = 0
+        self.closed = False
+
+    def cursor(self) -> "GifCursor":
+        """A reader with its own play position, direction and decoder"""
+        return GifCursor(self)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Surface:
+        if self.reader is None:
+            self.reader = self.cursor()
+        return self.reader[index]
+
+    def blank(self) -> Surface:
+        """Transparent frame shown before anything near the asked for frame is decoded"""
+        if self.empty is None:
+            self.empty = Surface(self.size, pygame.SRCALPHA)
+        return self.empty
+
+    def _store(self, index: int, entry: Surface | bytes):
+        """Called with the lock held"""
+        self.frames[index] = entry
+        cursors = [(c.last, c.direction) for c in list(self.cursors) if c.last is not None] or [(index, 1)]
+        while len(self.frames) > self.cache_frames * len(cursors):
+            # Furthest ahead of every cursor in its play direction is behind them all, read ahead frames stay
+            del self.frames[max(self.frames, key=lambda i: min((i - last) * direction % self.length
+                                                               for last, direction in cursors))]
+
+    def memory(self) -> int:
+        """Bytes of the frames decoded right now"""
+        with self.lock:
+            return sum(len(f) if isinstance(f, bytes) else f.get_pitch() * f.get_height()
+                       for f in self.frames.values())
+
+    def close(self):
+        for cursor in list(self.cursors):
+            cursor.close()
+        with self.lock:
+            self.frames.clear()
+            self.closed = True
+
+
+class GifCursor(object):
+    def __init__(self, stream: GifStream):
+        """One reader of a GifStream. After each frame the next read_ahead frames in its play direction are decoded
+        on a worker thread, or none under wasm or without background. Gifs only decode forward, so going backwards
+        restarts from the first frame and reads a block of frames at a time, once half the cache ahead has been used
+        up. A frame that isn't cached yet goes to the worker too, the nearest cached frame is shown until it is in.
+        Every cursor has its own decoder, so readers at different spots don't make each other restart"""
+        self.stream = stream
+        self.image = Image.open(stream.path)
+        # decode_lock guards the PIL image, so cached frames never wait on a decode
+        self.decode_lock = threading.Lock()
+        self.last: int = None
+        self.direction = 1
+        self.pending: Future = None
+        self.reading: frozenset[int] = frozenset()
+        self.request = 0
+        self.closed = False
+        stream.cursors.add(self)
+
+    def __len__(self) -> int:
+        return self.stream.length
+
+    def __getitem__(self, index: int) -> Surface:
+        stream = self.stream
+        if index < 0:
+            index += stream.length
+        if not 0 <= index < stream.length:
+            raise IndexError(index)
+        if self.last is not None and index != self.last:
+            step = (index - self.last) % stream.length
+            self.direction = 1 if step <= stream.length // 2 else -1
+        self.last = index
+        with stream.lock:
+            entry = stream.frames.get(index)
+        if entry is None:
+            stream.misses += 1
+            if stream.background:
+                # The worker decodes it, the nearest cached frame stands in until then
+                if index not in self.reading or self.pending.done():
+                    self._submit(self._window(index, True))
+                with stream.lock:
+                    nearest = min(stream.frames, default=None, key=lambda i: min((i - index) % stream.length,
+                                                                                 (index - i) % stream.length))
+                    if nearest is not None:
+                        entry = stream.frames[nearest]
+                if entry is None:
+                    # Nothing cached yet, decode it here when the decoder is a few frames off, otherwise show nothing.
+                    # The worker holds decode_lock for a whole seek, so how far off it is gets checked without it
+                    if self._seeks(index) <= stream.read_ahead + 1:
+                        with self.decode_lock:
+                            with stream.lock:
+                                entry = stream.frames.get(index)
+                            if entry is None and self._seeks(index) <= stream.read_ahead + 1:
+                                entry = self._decode(index)
+                    if entry is None:
+                        stream.stale += 1
+                        return stream.blank()
+                else:
+                    stream.stale += 1
+                    index = nearest
+            else:
+                with self.decode_lock:
+                    entry = self._decode(index)
+        else:
+            stream.hits += 1
+        if not isinstance(entry, Surface):
+            entry = pygame.image.frombytes(entry, stream.size, "RGBA")
+            if stream.color_key is not None:
+                entry.set_colorkey(stream.color_key)
+        with stream.lock:
+            stream._store(index, entry)
+        if stream.background and stream.read_ahead:
+            self._schedule(self.last)
+        return entry
+
+    def _seeks(self, index: int) -> int:
+        """Frames the decoder has to go through to get to index"""
+        position = self.image.tell()
+        return index - position if index >= position else index + 1
+
+    def _decode(self, index: int) -> bytes:
+        """RGBA bytes of a frame, called with decode_lock held"""
+        self.image.seek(index)
+        self.stream.decoded += 1
+        return self.image.convert("RGBA").tobytes()
+
+    def _window(self, index: int, including: bool = False) -> list[int]:
+        """Uncached frames next in the play direction from index, in the order the decoder reads them"""
+        stream = self.stream
+        count = stream.read_ahead if self.direction > 0 else stream.cache_frames - 1
+        ahead = [(index + self.direction * i) % stream.length
+                 for i in range(0 if including else 1, min(count, stream.length - 1) + 1)]
+        with stream.lock:
+            window = [i for i in ahead if i not in stream.frames]
+        if self.direction < 0:
+            # One pass up from the lowest frame instead of a restart per frame
+            window.sort()
+        return window
+
+    def _schedule(self, index: int):
+        if self.pending is not None and not self.pending.done():
+            return
+        window = self._window(index)
+        if self.direction < 0 and len(window) < self.stream.cache_frames // 2:
+            return
+        if window:
+            self._submit(window)
+
+    def _submit(self, window: list[int]):
+        """Read window on the worker, a read still going for this cursor stops at its next frame"""
+        self.reading = frozenset(window)
+        self.request += 1
+        self.pending = _executor().submit(self._read, window, self.request)
+
+    def _read(self, window: list[int], request: int):
+        stream = self.stream
+        for index in window:
+            with self.decode_lock:
+                with stream.lock:
+                    if self.closed or request != self.request:
+                        return
+                    if index in stream.frames:
+                        continue
+                data = self._decode(index)
+            with stream.lock:
+                stream._store(index, data)
+
+    def close(self):
+        with self.decode_lock:
+            self.image.close()
+            self.closed = True
+        self.stream.cursors.discard(self)
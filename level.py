@@ -1,8 +1,14 @@
-from pygame import Surface
-from pygame.sprite import LayeredUpdates
-from pymunk import Space
+import itertools
+import statistics
+import time
+from pygame import Surface, Rect
+from pygame.sprite import LayeredUpdates, Sprite
+from pymunk import Space, Body, Circle, Poly, Segment
 import shared
 
+PROFILE_SETTINGS = ("iterations", "sleep_time_threshold", "idle_speed_threshold", "collision_slop", "collision_bias",
+                    "damping")
+
 
 def update_space(callback, *sprites):
     for sprite in sprites:
@@ -23,13 +29,298 @@ def update_space(callback, *sprites):
                 pass
 
 
+def track(sprite: Sprite):
+    """Check a sprite for rect and image changes every draw again after set_static"""
+    set_static(sprite, False)
+
+
+def set_static(sprite: Sprite, static: bool = True):
+    """Levels check every sprite for rect and image changes each draw. A static sprite is only checked for a new
+    image while it is on screen, after moving it call level.reindex(sprite)"""
+    sprite.static = static
+    for group in sprite.groups():
+        if isinstance(group, Level):
+            if static:
+                group.moving.pop(sprite, None)
+            elif sprite not in group.moving:
+                # Nothing matches, so the next draw reindexes it
+                group.moving[sprite] = [None, None, None]
+
+
+def copy_space(space: Space) -> Space:
+    """Bodies and shapes of a space without the game objects or callbacks attached to them, for trial runs"""
+    copy = Space()
+    copy.gravity = space.gravity
+    for name in PROFILE_SETTINGS:
+        setattr(copy, name, getattr(space, name))
+    bodies = {}
+    for shape in space.shapes:
+        body = shape.body
+        if (b := bodies.get(body)) is None:
+            b = bodies[body] = Body(body.mass, body.moment, body.body_type)
+            b.position = body.position
+            b.angle = body.angle
+            if body.body_type != Body.STATIC:
+                b.velocity = body.velocity
+                b.angular_velocity = body.angular_velocity
+            copy.add(b)
+        if isinstance(shape, Circle):
+            s = Circle(b, shape.radius, shape.offset)
+        elif isinstance(shape, Poly):
+            s = Poly(b, shape.get_vertices(), radius=shape.radius)
+        elif isinstance(shape, Segment):
+            s = Segment(b, shape.a, shape.b, shape.radius)
+        else:
+            continue
+        s.friction = shape.friction
+        s.elasticity = shape.elasticity
+        s.filter = shape.filter
+        copy.add(s)
+    return copy
+
+
+def calibrate_spatial_hash(space: Space, steps: int = 60, dt: float = None, warmup: int = 10,
+                           rounds: int = 3) -> list[tuple[float, int, float]]:
+    """Time steps of copies of a space with spatial hash sizes picked from its shapes, taking the best of
+    interleaved rounds after warmup steps to rebuild contacts.
+    Returns (dim, count, seconds per step) fastest first, dim 0 is the default bounding box tree"""
+    dt = shared.physics_step if dt is None else dt
+    shapes = space.shapes
+    if not shapes:
+        return []
+    extents = [max(bb.right - bb.left, bb.top - bb.bottom) for bb in (shape.bb for shape in shapes)]
+    typical = max(statistics.median(extents), 1.0)
+    candidates = [(0, 0)]
+    for dim_scale in (1, 2, 4):
+        for count_scale in (1, 4, 10):
+            candidates.append((round(typical * dim_scale, 1), len(shapes) * count_scale))
+    trials = []
+    for dim, count in candidates:
+        trial = copy_space(space)
+        if dim:
+            trial.use_spatial_hash(dim, count)
+        for _ in range(warmup):
+            trial.step(dt)
+        trials.append(trial)
+    best = [float("inf")] * len(trials)
+    per_round = max(steps // rounds, 1)
+    for _ in range(rounds):
+        for i, trial in enumerate(trials):
+            start = time.perf_counter()
+            for _ in range(per_round):
+                trial.step(dt)
+            best[i] = min(best[i], (time.perf_counter() - start) / per_round)
+    return sorted([(dim, count, t) for (dim, count), t in zip(candidates, best)], key=lambda r: r[2])
+
+
 class Level(LayeredUpdates):
-    def __init__(self, background=None, gravity=(0, -500)):
-        self.background: Surface = background
+    def __init__(self, background=None, gravity=(0, -500), cell_size: int = 256, physics_profile: dict = None):
+        """Sprites are kept in a spatial hash of cell_size cells so draw only visits cells on screen.
+        Every sprite is checked for rect and image changes each draw, unless set_static(sprite) opted it out.
+        physics_profile defaults to shared.physics_profile, see set_physics_profile"""
+        self._background: Surface = background
         self.space: Space = Space()
         self.space.gravity = gravity
+        self.physics_profile: dict = {}
+        self.set_physics_profile(shared.physics_profile if physics_profile is None else physics_profile)
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], set[Sprite]] = {}
+        self.sprite_cells: dict[Sprite, tuple[int, int, int, int]] = {}
+        self.order: dict[Sprite, int] = {}
+        # Sprites checked for changes every draw, all but static ones, with their image, rect and a copy of the
+        # rect as of their last reindex
+        self.moving: dict[Sprite, list] = {}
+        self.pending: set[Sprite] = set()
+        self._order_ids = itertools.count()
+        self.entries: dict[Sprite, tuple[Surface, Rect]] = {}
+        self.version = 0
+        self.visible: list[tuple[Surface, Rect]] = []
+        self.visible_index: dict[Sprite, int] = {}
+        self.visible_static: list[Sprite] = []
+        self._visible_key = None
+        # Only kept with shared.dirty_rendering, drawn_synced is false after frames without it
+        self.drawn: dict[Sprite, tuple[Surface, Rect]] = {}
+        self.dirty: list[Rect] = []
+        self.drawn_synced = shared.dirty_rendering
+        self.accumulator = 0.0
         super().__init__()
 
+    @property
+    def background(self) -> Surface:
+        return self._background
+
+    @background.setter
+    def background(self, background: Surface):
+        self._background = background
+        shared.mark_dirty()
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.order[sprite] = next(self._order_ids)
+        if getattr(sprite, "rect", None) is None:
+            self.pending.add(sprite)
+        else:
+            self._index_new(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.order.pop(sprite, None)
+        self.moving.pop(sprite, None)
+        self.pending.discard(sprite)
+        self.entries.pop(sprite, None)
+        if sprite in self.visible_index:
+            self.version += 1
+        self._unindex(sprite)
+        if (old := self.drawn.pop(sprite, None)) is not None and shared.dirty_rendering:
+            self.dirty.append(old[1])
+
+    def change_layer(self, sprite, new_layer):
+        super().change_layer(sprite, new_layer)
+        self.order[sprite] = next(self._order_ids)
+        if sprite in self.visible_index:
+            self.version += 1
+        if (old := self.drawn.get(sprite)) is not None and shared.dirty_rendering:
+            self.dirty.append(old[1])
+
+    def _index_new(self, sprite):
+        if not getattr(sprite, "static", False):
+            self.moving[sprite] = [None, None, None]
+        self.entries[sprite] = (sprite.image, sprite.rect)
+        if shared.dirty_rendering:
+            rect = sprite.rect.copy()
+            self.drawn[sprite] = (sprite.image, rect)
+            self.dirty.append(rect)
+        self.reindex(sprite)
+
+    def _unindex(self, sprite):
+        if (old := self.sprite_cells.pop(sprite, None)) is None:
+            return
+        cells = self.cells
+        for cx in range(old[0], old[2] + 1):
+            for cy in range(old[1], old[3] + 1):
+                cell = cells[cx, cy]
+                cell.discard(sprite)
+                if not cell:
+                    del cells[cx, cy]
+
+    def _in_view(self, span) -> bool:
+        """If cells overlap the cells of the last visible_entries call"""
+        if span is None or (key := self._visible_key) is None:
+            return False
+        return span[0] <= key[2] and key[0] <= span[2] and span[1] <= key[3] and key[1] <= span[3]
+
+    def reindex(self, sprite):
+        """Update the spatial index cells and render list entry of a sprite after its rect or image changed,
+        and with shared.dirty_rendering its old and new area"""
+        rect: Rect = sprite.rect
+        if shared.dirty_rendering:
+            self._mark_drawn(sprite)
+        entry = self.entries[sprite]
+        if entry[0] is not sprite.image or entry[1] is not rect:
+            entry = self.entries[sprite] = (sprite.image, rect)
+            if (i := self.visible_index.get(sprite)) is not None:
+                self.visible[i] = entry
+        if (check := self.moving.get(sprite)) is not None:
+            check[0] = sprite.image
+            check[1] = rect
+            if check[2] is None:
+                check[2] = rect.copy()
+            else:
+                check[2].update(rect)
+        cs = self.cell_size
+        span = (rect.left // cs, rect.top // cs, (rect.right - 1) // cs, (rect.bottom - 1) // cs)
+        if (old := self.sprite_cells.get(sprite)) == span:
+            return
+        if self._in_view(old) != self._in_view(span):
+            self.version += 1
+        self._unindex(sprite)
+        self.sprite_cells[sprite] = span
+        cells = self.cells
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                if (cell := cells.get((cx, cy))) is None:
+                    cell = cells[cx, cy] = set()
+                cell.add(sprite)
+
+    def query(self, rect: Rect) -> list[Sprite]:
+        """Sprites whose index cells overlap a rect, in draw order"""
+        cs = self.cell_size
+        cells = self.cells
+        found = set()
+        for cx in range(rect.left // cs, (rect.right - 1) // cs + 1):
+            for cy in range(rect.top // cs, (rect.bottom - 1) // cs + 1):
+                if cell := cells.get((cx, cy)):
+                    found.update(cell)
+        layers = self._spritelayers
+        order = self.order
+        return sorted(found, key=lambda x: (layers[x], order[x]))
+
+    def refresh_index(self):
+        """Reindex sprites that aren't static and sprites added before they had a rect"""
+        if self.pending:
+            for sprite in list(self.pending):
+                if getattr(sprite, "rect", None) is not None:
+                    self.pending.discard(sprite)
+                    self._index_new(sprite)
+        for sprite, (image, rect, indexed) in self.moving.items():
+            # Most sprites don't change between frames, only those that did pay for a reindex
+            if sprite.rect is not rect or sprite.image is not image or rect != indexed:
+                if sprite.rect is not None:
+                    self.reindex(sprite)
+        entries = self.entries
+        for sprite in self.visible_static:
+            if (entry := entries.get(sprite)) is not None and entry[0] is not sprite.image:
+                self.reindex(sprite)
+
+    def collect_dirty(self) -> list[Rect]:
+        """Areas that changed since the last call: added and removed sprites and moving sprites
+        whose rect or image changed, both the old and the new rect. Areas are only kept with shared.dirty_rendering"""
+        self.refresh_index()
+        if not self.drawn_synced:
+            # Dirty rendering was just turned on, start from a full redraw
+            self.drawn_synced = True
+            self.drawn = {s: (s.image, s.rect.copy()) for s in self.entries}
+            self.dirty = []
+            shared.mark_dirty()
+        rects = self.dirty
+        self.dirty = []
+        return rects
+
+    def _mark_drawn(self, sprite):
+        """Queue the old and new area of a sprite whose rect or image changed since it was last drawn"""
+        rect = sprite.rect
+        image = sprite.image
+        old = self.drawn.get(sprite)
+        if old is None or old[0] is not image or old[1] != rect:
+            if old is not None:
+                self.dirty.append(old[1])
+            rect = rect.copy()
+            self.dirty.append(rect)
+            self.drawn[sprite] = (image, rect)
+
+    def set_physics_profile(self, profile: dict):
+        """Apply space settings, any of: iterations, spatial_hash as (dim, count), sleep_time_threshold,
+        idle_speed_threshold, collision_slop, collision_bias and damping. A spatial hash can't be turned off again"""
+        space = self.space
+        for name in PROFILE_SETTINGS:
+            if name in profile:
+                setattr(space, name, profile[name])
+        if (spatial_hash := profile.get("spatial_hash")) is not None:
+            space.use_spatial_hash(*spatial_hash)
+        self.physics_profile.update(profile)
+
+    def calibrate_physics(self, steps: int = 60, margin: float = 0.1) -> tuple[float, int] | None:
+        """Use the fastest spatial hash for the bodies in the space right now, if it beats the default by margin"""
+        results = calibrate_spatial_hash(self.space, steps)
+        if not results or not results[0][0]:
+            return None
+        default = next(r[2] for r in results if not r[0])
+        if default * (1 - margin) < results[0][2]:
+            return None
+        spatial_hash = results[0][:2]
+        self.set_physics_profile({"spatial_hash": spatial_hash})
+        return spatial_hash
+
     def add(self, *sprites, **kwargs):
         super().add(*sprites, **kwargs)
         update_space(self.space.add, *sprites)
@@ -43,8 +334,31 @@ class Level(LayeredUpdates):
             s.kill()
         self.space.remove(*self.space.bodies, *self.space.shapes, *self.space.constraints)
 
+    def step_space(self, delta_time: float):
+        """Step physics once per frame, or with shared.fixed_timestep in physics_step steps for the time that passed.
+        Sets shared.physics_alpha to how far the frame is between the last two steps"""
+        if not shared.fixed_timestep:
+            self.space.step(shared.space_delta_time)
+            shared.physics_alpha = 1.0
+            return
+        step = shared.physics_step
+        # Time past the substep limit is dropped so a long frame can't make the next ones longer
+        self.accumulator = min(self.accumulator + delta_time, step * shared.physics_max_substeps)
+        steps = int(self.accumulator / step)
+        for i in range(steps):
+            if i == steps - 1:
+                for body in self.space.bodies:
+                    body.previous_position = body.position
+                    body.previous_angle = body.angle
+            self.space.step(step)
+            self.accumulator -= step
+        shared.physics_alpha = min(self.accumulator / step, 1.0)
+
     def update(self, *args, **kwargs):
-        self.space.step(shared.space_delta_time)
+        if not shared.dirty_rendering and self.drawn_synced:
+            self.drawn_synced = False
+            self.drawn.clear()
+        self.step_space(shared.delta_time)
         super().update(*args, **kwargs)
 
     def draw_bg(self, surface: Surface):
@@ -53,18 +367,75 @@ class Level(LayeredUpdates):
         else:
             surface.fill("black")
 
+    def draw_bg_areas(self, surface: Surface, rects: list[Rect]):
+        """Redraw the background under a list of rects"""
+        if self.background:
+            background = self.background
+            surface.blits([(background, rect, rect) for rect in rects], doreturn=False)
+        else:
+            for rect in rects:
+                surface.fill("black", rect)
+
+    def draw_areas(self, surface: Surface, rects: list[Rect]):
+        """Redraw the sprites overlapping a list of rects, clipped to each rect"""
+        clip = surface.get_clip()
+        entries = self.entries
+        for rect in rects:
+            surface.set_clip(rect)
+            surface.fblits([entries[i] for i in self.query(rect)])
+        surface.set_clip(clip)
+        if shared.debug_physics:
+            self.space.debug_draw(shared.draw_options)
+
+    def visible_entries(self, rect: Rect) -> list[tuple[Surface, Rect]]:
+        """Blit sequence of the sprites in a rect's index cells, kept between frames until the cells or sprites
+        in them change"""
+        cs = self.cell_size
+        key = (rect.left // cs, rect.top // cs, (rect.right - 1) // cs, (rect.bottom - 1) // cs, self.version)
+        if key != self._visible_key:
+            self._visible_key = key
+            entries = self.entries
+            sprites = self.query(rect)
+            moving = self.moving
+            self.visible_static = [sprite for sprite in sprites if sprite not in moving]
+            for sprite in self.visible_static:
+                # Static sprites off screen may have changed image since they were last checked
+                if entries[sprite][0] is not sprite.image:
+                    entries[sprite] = (sprite.image, sprite.rect)
+                    if shared.dirty_rendering:
+                        self._mark_drawn(sprite)
+            self.visible = [entries[i] for i in sprites]
+            self.visible_index = {sprite: i for i, sprite in enumerate(sprites)}
+        return self.visible
+
     def draw(self, surface):
-        surface.fblits([(i.image, i.rect) for i in filter(lambda x: shared.screen_rect.colliderect(x.rect),
-                                                          self.sprites())])
+        self.refresh_index()
+        self.dirty.clear()
+        surface.fblits(self.visible_entries(shared.screen_rect))
         if shared.debug_physics:
             self.space.debug_draw(shared.draw_options)
 
 
 level: Level = Level()
+_current: Level = level
+
+
+def current_level() -> Level:
+    """The active level, use this instead of the default level singleton so levels can be swapped"""
+    return _current
+
+
+def set_level(new_level: Level) -> Level:
+    """Make a level the active one, returns the previous one"""
+    global _current
+    previous = _current
+    _current = new_level
+    shared.mark_dirty()
+    return previous
 
 
 def add_collision_handler(collision_type_a, collision_type_b, begin, separate=None):
-    handler = level.space.add_collision_handler(collision_type_a, collision_type_b)
+    handler = _current.space.add_collision_handler(collision_type_a, collision_type_b)
     handler.begin = begin
     if separate is not None:
         handler.separate = separate
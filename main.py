@@ -9,16 +9,22 @@
 # ///
 
 import asyncio
+import time
 import numpy
 import PIL
 
 import game
+from replay import InputRecorder, InputReplayer
 from task_manager import *
 
 """ Debug print numpy/pil """
 if shared.debug:
     util.log([numpy, PIL])
 
+""" Warm the asset registries in the background """
+if shared.preload:
+    shared.preload_assets()
+
 """ Startup sequence """
 Sequencer(
     TimeWait(0.25),
@@ -28,31 +34,131 @@ Sequencer(
 ).build(False, False).start()
 
 """ Level update """
-Task(level.update).start()
+
+
+def update_level(task):
+    current_level().update(task)
+    return task.cont
+
+
+Task(update_level).start()
+
+
+def render():
+    """ Redraw the whole frame """
+    level = current_level()
+    shared.screen.fill("gray")
+    level.draw_bg(shared.canvas)
+    exec_tasks(TT_DRAW)
+    level.draw(shared.canvas)
+    exec_tasks(TT_OVERLAY)
+    shared.screen.blit(shared.canvas, (0, 0), shared.screen_rect)
+    exec_tasks(TT_SCREEN)
+
+
+last_camera = None
+task_rects: list[Rect] = []
+
+
+def render_dirty() -> list[Rect] | None:
+    """ Redraw only the areas that changed, returns the screen rects to update or None after a full redraw """
+    global last_camera, task_rects
+    level = current_level()
+    camera = shared.screen_rect.topleft
+    if camera != last_camera:
+        last_camera = camera
+        shared.dirty_full = True
+    # Areas drawn by tasks last frame are cleared along with the sprite changes
+    rects = level.collect_dirty() + task_rects
+    shared.dirty_rects = task_rects = []
+    if shared.dirty_full or shared.dirty_rect_limit < len(rects):
+        shared.dirty_full = False
+        render()
+        task_rects = shared.dirty_rects
+        return None
+    level.draw_bg_areas(shared.canvas, rects)
+    exec_tasks(TT_DRAW)
+    rects += task_rects
+    level.draw_areas(shared.canvas, rects)
+    marked = len(task_rects)
+    exec_tasks(TT_OVERLAY)
+    rects += task_rects[marked:]
+    view = shared.screen_rect
+    offset = (-view.x, -view.y)
+    areas = [area for rect in rects if (area := rect.clip(view))]
+    shared.screen.blits([(shared.canvas, area.move(offset), area) for area in areas], doreturn=False)
+    marked = len(task_rects)
+    exec_tasks(TT_SCREEN)
+    areas += [area for rect in task_rects[marked:] if (area := rect.clip(view))]
+    return [area.move(offset) for area in areas]
 
 
 async def main():
-    """ Main loop """
+    """ Main loop, in headless mode frames are not shown or capped and every frame is headless_delta_time long.
+    frame_limit and time_limit (wall clock seconds) end the loop when set """
+    frames = 0
+    start = time.perf_counter()
+    recorder = InputRecorder(shared.record_path) if shared.record_path else None
+    replayer = InputReplayer(shared.replay_path) if shared.replay_path else None
     while shared.running:
-        events = pygame.event.get()
+        if replayer is not None:
+            pygame.event.pump()
+            if (frame := replayer.next_frame()) is None:
+                break
+            shared.delta_time, events = frame
+            scheduler.budget_runs = replayer.budget_runs
+        else:
+            events = pygame.event.get()
+            shared.poll_input()
+        if recorder is not None:
+            recorder.record(shared.delta_time, events)
         for event in events:
             if event.type == pygame.QUIT:
                 shared.running = False
                 break
             exec_binding(event)
-        if not shared.paused:
-            shared.screen.fill("gray")
-            exec_tasks(TT_TASK)
-            level.draw_bg(shared.canvas)
-            exec_tasks(TT_DRAW)
-            level.draw(shared.canvas)
-            exec_tasks(TT_OVERLAY)
-            shared.screen.blit(shared.canvas, (0, 0), shared.screen_rect)
-            exec_tasks(TT_SCREEN)
-        pygame.display.flip()
-        shared.delta_time = shared.clock.tick(shared.fps) / shared.delta_slowdown
-        pygame.display.set_caption(f"Fps: {int(shared.clock.get_fps())}")
+        if shared.headless:
+            if not shared.paused:
+                exec_timers()
+                exec_tasks(TT_TASK)
+                exec_tasks(TT_DRAW)
+                exec_tasks(TT_OVERLAY)
+                exec_tasks(TT_SCREEN)
+            shared.delta_time = shared.headless_delta_time
+        else:
+            rects = None
+            if not shared.paused:
+                exec_timers()
+                exec_tasks(TT_TASK)
+                if shared.dirty_rendering:
+                    rects = render_dirty()
+                else:
+                    render()
+            if rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(rects)
+            # Replays run uncapped, their delta time comes from the log
+            shared.delta_time = shared.clock.tick(0 if replayer else shared.fps) / shared.delta_slowdown
+            if shared.debug:
+                pygame.display.set_caption(f"Fps: {int(shared.clock.get_fps())} Deferred: {scheduler.deferred}")
+            else:
+                pygame.display.set_caption(f"Fps: {int(shared.clock.get_fps())}")
+        if recorder is not None:
+            recorder.end_frame(scheduler.budget_ran)
+        frames += 1
+        if shared.frame_limit and shared.frame_limit <= frames:
+            shared.running = False
+        if shared.time_limit and shared.time_limit <= time.perf_counter() - start:
+            shared.running = False
         await asyncio.sleep(0)
+    if recorder is not None:
+        recorder.close()
+    if replayer is not None:
+        replayer.close()
+    if shared.headless or replayer is not None:
+        seconds = time.perf_counter() - start
+        util.log(f"{frames} frames in {seconds:.3f} s, {frames / max(seconds, 1e-9):.1f} fps")
     pygame.quit()
 asyncio.run(main())
 
@@ -0,0 +1,133 @@
+import math
+import time
+import pygame
+from pygame.mixer import Sound, Channel
+
+DEFAULT_CATEGORY = "effects"
+
+
+class MixerManager(object):
+    def __init__(self, pools: dict[str, int] = None, max_voices: int = 4, volume: float = 1.0):
+        """Plays sounds on channels reserved per category, pools maps a category to its channel count.
+        Each sound plays on at most max_voices channels at once, past that its oldest voice is restarted. A full
+        pool steals its lowest priority voice, oldest first, as long as the new sound's priority is not lower.
+        Volumes are only sent to the mixer when a channel's volume changes"""
+        self.pools = dict(pools or {DEFAULT_CATEGORY: 12, "ui": 4})
+        self.max_voices = max_voices
+        self.volume = volume
+        self.category_volume: dict[str, float] = {}
+        # Per sound name or Sound: category, priority, max voices and volume
+        self.options: dict[str | Sound, tuple[str, int, int, float]] = {}
+        self.lengths: dict[Sound, float] = {}
+        self.channels: dict[str, list[int]] = {}
+        self.mixer_channels: list[Channel] = []
+        # Per channel: what plays on it, its priority, when it started and ends, and the volume it was given
+        self.keys: list[str | Sound] = []
+        self.priorities: list[int] = []
+        self.starts: list[float] = []
+        self.ends: list[float] = []
+        self.volumes: list[float] = []
+        self.plays = 0
+        self.restarted = 0
+        self.stolen = 0
+        self.dropped = 0
+        self.volume_changes = 0
+
+    def ready(self) -> bool:
+        """Reserve the pools on first use, false without a mixer"""
+        if self.mixer_channels:
+            return True
+        if not pygame.mixer or not pygame.mixer.get_init():
+            return False
+        total = sum(self.pools.values())
+        pygame.mixer.set_num_channels(max(total, pygame.mixer.get_num_channels()))
+        # Sound.play picks from the channels past the reserved ones, so it never cuts into a pool
+        pygame.mixer.set_reserved(total)
+        first = 0
+        for category, count in self.pools.items():
+            self.channels[category] = list(range(first, first + count))
+            first += count
+        self.mixer_channels = [Channel(i) for i in range(total)]
+        self.keys = [None] * total
+        self.priorities = [0] * total
+        self.starts = [0.0] * total
+        self.ends = [0.0] * total
+        self.volumes = [-1.0] * total
+        return True
+
+    def configure(self, key: str | Sound, category: str = DEFAULT_CATEGORY, priority: int = 0,
+                  max_voices: int = None, volume: float = 1.0):
+        """Play options of a sound, by registry name or Sound"""
+        if category not in self.pools:
+            raise KeyError(f"No channel pool for sound category {category}")
+        self.options[key] = (category, priority, self.max_voices if max_voices is None else max_voices, volume)
+
+    def set_volume(self, volume: float, category: str = None):
+        """Master volume, or one category's, takes effect from the next play on each channel"""
+        if category is None:
+            self.volume = volume
+        else:
+            self.category_volume[category] = volume
+
+    def play(self, key: str | Sound, sound: Sound, loops: int = 0, priority: int = None) -> Channel | None:
+        """Play sound under key's options, the channel it got or None when every voice outranks it"""
+        if sound is None or not self.ready():
+            return None
+        category, default_priority, max_voices, volume = self.options.get(
+            key, (DEFAULT_CATEGORY, 0, self.max_voices, 1.0))
+        if priority is None:
+            priority = default_priority
+        now = time.perf_counter()
+        ends, keys, starts = self.ends, self.keys, self.starts
+        pool = self.channels[category]
+        channel = free = None
+        voices = 0
+        oldest = None
+        for i in pool:
+            if ends[i] <= now:
+                if free is None:
+                    free = i
+            elif keys[i] == key:
+                voices += 1
+                if oldest is None or starts[i] < starts[oldest]:
+                    oldest = i
+        if voices >= max_voices:
+            channel = oldest
+            self.restarted += 1
+        elif free is not None:
+            channel = free
+        else:
+            channel = min(pool, key=lambda c: (self.priorities[c], starts[c]))
+            if self.priorities[channel] > priority:
+                self.dropped += 1
+                return None
+            self.stolen += 1
+        if (length := self.lengths.get(sound)) is None:
+            length = self.lengths[sound] = sound.get_length()
+        keys[channel] = key
+        self.priorities[channel] = priority
+        starts[channel] = now
+        ends[channel] = math.inf if loops < 0 else now + length * (loops + 1)
+        mixer_channel = self.mixer_channels[channel]
+        channel_volume = self.volume * self.category_volume.get(category, 1.0) * volume
+        if channel_volume != self.volumes[channel]:
+            mixer_channel.set_volume(channel_volume)
+            self.volumes[channel] = channel_volume
+            self.volume_changes += 1
+        mixer_channel.play(sound, loops)
+        self.plays += 1
+        return mixer_channel
+
+    def stop(self, category: str = None):
+        """Stop every pooled channel, or one category's"""
+        if not self.mixer_channels:
+            return
+        for i in (self.channels[category] if category else range(len(self.mixer_channels))):
+            self.mixer_channels[i].stop()
+            self.ends[i] = 0.0
+
+    def busy(self, category: str = None) -> int:
+        """Voices playing right now going by sound lengths"""
+        now = time.perf_counter()
+        return sum(1 for i in (self.channels.get(category, []) if category else range(len(self.ends)))
+                   if self.ends[i] > now)
@@ -5,8 +5,10 @@ from pygame import Surface, Vector2, Rect
 from pygame.sprite import Sprite
 import shared
 import util
-from level import level
+from chunk_cache import ChunkCache
+from level import current_level
 from playercontroller import PlayerController
+from task_manager import Task
 
 CELL_SIZE = 40
 
@@ -34,8 +36,6 @@ class Cell(object):
         return super().__getattribute__(item)
 
 
-grid = np.empty((WIDTH, HEIGHT), dtype=Cell)
-
 cell_colors = {
     EMPTY: "black",
     WALL: "white"
@@ -59,35 +59,39 @@ def generate_column(rand=True):
 
 def init():
     mouse = PlayerController()
+    level = current_level()
     level.add(mouse)
-    # for i in range(WIDTH * HEIGHT):
-    #     x = i // HEIGHT
-    #     y = i % HEIGHT
-    #     i = WALL if x == 0 or x == WIDTH or y == 0 or y == HEIGHT - 1 else EMPTY
-    #     grid[x, y] = Cell(i)
     level.background = bg
     # shared.set_canvas(bg)
-    # grid[:, :] = generate_column(False)
+    # Scrolls bg before the level draws it
+    Task(game_loop).start()
 
 
-scroll_offset = 0
 SCROLL_SPEED = 50
 
+columns: dict[int, np.ndarray] = {}
+
+
+def get_column(x: int) -> np.ndarray:
+    """Column of the endless map at world column x, generated the first time it is seen"""
+    if (column := columns.get(x)) is None:
+        column = columns[x] = generate_column(x > WIDTH)
+    return column
+
+
+def draw_cell(surface, x, y, rect):
+    if 0 <= y < HEIGHT:
+        surface.blit(get_column(x)[y].image, rect)
+
+
+grid_cache = ChunkCache(CELL_SIZE, draw_cell, chunk_cells=8, fill="dark gray", max_chunks=16)
+
 
 def game_loop(task):
-    # global grid, scroll_offset
-    # scroll_offset += SCROLL_SPEED * shared.delta_time
-    # if scroll_offset >= CELL_SIZE:  # If moved a full tile, shift the grid
-    #     scroll_offset -= CELL_SIZE
-    #     grid = np.roll(grid, -1, axis=0)  # Shift everything left
-    #     grid[-1, :] = generate_column()   # Add new platforms at the right
-    # bg.fill((0, 0, 0))
-    #
-    # for i in range(WIDTH * HEIGHT):
-    #     x = i // HEIGHT
-    #     y = i % HEIGHT
-    #     cell = grid[i // HEIGHT, i % HEIGHT]
-    #     cell.rect = bg.blit(cell.image, (x * CELL_SIZE - scroll_offset, y * CELL_SIZE))
-    #
-    # level.background = bg
+    grid_cache.scroll(SCROLL_SPEED * shared.delta_time)
+    first = int(grid_cache.offset.x // CELL_SIZE)
+    for x in [x for x in columns if x < first - WIDTH]:
+        del columns[x]
+    for rect in grid_cache.draw(bg):
+        shared.mark_dirty(rect)
     return task.cont
@@ -2,6 +2,9 @@ import pygame.key
 import shared
 from task_manager import *
 
+# Per letter chimes from ScrollingText stack up to three and give way to effects
+shared.mixer_manager.configure("chime_bell", "ui", priority=-1, max_voices=3)
+
 
 def s(task):
     shared.play_sound("chime_bell")
@@ -9,7 +12,7 @@ def s(task):
 
 
 def skip(task):
-    if pygame.key.get_pressed()[pygame.K_t]:
+    if shared.keys_pressed[pygame.K_t]:
         return task.end
     return task.cont
 
@@ -39,7 +42,7 @@ def scroll():
 
 
 def click(task, *args, **kwargs):
-    if pygame.mouse.get_pressed()[0]:
+    if shared.mouse_buttons[0]:
         pass
         # sprite = shared.get_plain_sprite(None)
         # sprite.rect.center = shared.get_mouse_pos()
@@ -69,7 +72,7 @@ class PlayerController(Sprite):
         def toggle_pause(task):
             if not self.alive():
                 return task.end
-            keys = pygame.key.get_pressed()
+            keys = shared.keys_pressed
             if keys[pygame.K_SPACE]:
                 shared.paused = not shared.paused
             return task.cont
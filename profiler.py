@@ -0,0 +1,105 @@
+import json
+import time
+from collections import deque
+
+COUNTER = "counter"
+
+BUCKET_NAMES = {
+    0: "TT_TASK",
+    1: "TT_DRAW",
+    2: "TT_OVERLAY",
+    3: "TT_SCREEN"
+}
+
+
+def task_name(task) -> str:
+    """Name a task by its class, plain tasks are named by their task func"""
+    name = type(task).__name__
+    if name in ("Task", "GeneratorTask"):
+        return f"{name}:{getattr(task.task_func, '__qualname__', '?')}"
+    return name
+
+
+def bucket_name(bucket) -> str:
+    if isinstance(bucket, int):
+        return BUCKET_NAMES.get(bucket, str(bucket))
+    return str(bucket)
+
+
+class TaskProfiler(object):
+    def __init__(self, capacity: int = 100000):
+        """Per task timing for the scheduler, keeps the newest events in a fixed size ring buffer"""
+        self.frame: int = 0
+        self.stats: dict[tuple[str, str], list] = {}
+        self.bucket_stats: dict[str, list] = {}
+        self.events: deque[tuple[int, str, str, float, float]] = deque(maxlen=capacity)
+
+    def record(self, bucket, task, start: float, duration: float):
+        """Record one task execute, times are in seconds"""
+        b_name = bucket_name(bucket)
+        name = task_name(task)
+        key = (b_name, name)
+        if (stat := self.stats.get(key)) is None:
+            stat = self.stats[key] = [0, 0.0, 0.0]
+        stat[0] += 1
+        stat[1] += duration
+        if stat[2] < duration:
+            stat[2] = duration
+        self.events.append((self.frame, b_name, name, start, duration))
+
+    def record_bucket(self, bucket, start: float, duration: float):
+        """Record one run of a whole bucket"""
+        b_name = bucket_name(bucket)
+        if (stat := self.bucket_stats.get(b_name)) is None:
+            stat = self.bucket_stats[b_name] = [0, 0.0, 0.0]
+        stat[0] += 1
+        stat[1] += duration
+        if stat[2] < duration:
+            stat[2] = duration
+        self.events.append((self.frame, b_name, b_name, start, duration))
+
+    def record_counter(self, name: str, value: float):
+        """Record a per frame counter, e.g. deferred tasks"""
+        self.events.append((self.frame, COUNTER, name, time.perf_counter(), value))
+
+    def reset(self):
+        self.stats.clear()
+        self.bucket_stats.clear()
+        self.events.clear()
+
+    def report(self, top: int = 20) -> str:
+        """Text table of the tasks with the most total time"""
+        lines = [f"{'bucket':<12} {'task':<60} {'calls':>8} {'total ms':>10} {'worst ms':>10}"]
+        for b_name, stat in self.bucket_stats.items():
+            lines.append(f"{b_name:<12} {'(bucket)':<60} {stat[0]:>8} {stat[1] * 1e3:>10.3f} {stat[2] * 1e3:>10.3f}")
+        ordered = sorted(self.stats.items(), key=lambda i: i[1][1], reverse=True)[:top]
+        for (b_name, name), stat in ordered:
+            lines.append(f"{b_name:<12} {name[-60:]:<60} {stat[0]:>8} {stat[1] * 1e3:>10.3f} {stat[2] * 1e3:>10.3f}")
+        return "\n".join(lines)
+
+    def chrome_trace(self, frames: int = 0) -> dict:
+        """Chrome trace event data for the last frames, 0 for everything in the ring buffer"""
+        first = self.frame - frames + 1 if frames else None
+        events = []
+        for frame, b_name, name, start, duration in self.events:
+            if first is not None and frame < first:
+                continue
+            if b_name == COUNTER:
+                events.append({"name": name, "ph": "C", "ts": start * 1e6, "pid": 0, "args": {name: duration}})
+                continue
+            events.append({
+                "name": name,
+                "cat": b_name,
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": duration * 1e6,
+                "pid": 0,
+                "tid": b_name,
+                "args": {"frame": frame}
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str, frames: int = 0):
+        """Write chrome trace event json, open it in chrome://tracing or perfetto"""
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(frames), f)
@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+from typing import Any, Callable
+
+_MISSING = object()
+
+
+class LazyRegistry(object):
+    def __init__(self, decode: Callable[[str], Any], finish: Callable[[str, Any], Any] = None):
+        """Asset registry that only indexes file names, decode(path) runs the first time an entry is asked for.
+        decode must be safe to run on a worker thread, finish(key, decoded) runs on the caller's thread for the
+        work that needs the display, like convert_alpha"""
+        self.decode = decode
+        self.finish = finish
+        self.paths: dict[str, str] = {}
+        self.entries: dict[str, Any] = {}
+        self.decoded: dict[str, Any] = {}
+        self.lock = threading.Lock()
+        self.thread: threading.Thread = None
+
+    def index(self, directory: str, names: list[str]):
+        """Register files by their name without the extension"""
+        for name in names:
+            key = name.split('.')[0]
+            self.paths[key] = os.path.join(directory, name)
+            self.entries.pop(key, None)
+
+    def _load(self, key: str):
+        with self.lock:
+            decoded = self.decoded.pop(key, _MISSING)
+            if decoded is _MISSING:
+                decoded = self.decode(self.paths[key])
+        entry = decoded if self.finish is None else self.finish(key, decoded)
+        self.entries[key] = entry
+        return entry
+
+    def get(self, key: str, default=None):
+        if (entry := self.entries.get(key, _MISSING)) is not _MISSING:
+            return entry
+        if key not in self.paths:
+            return default
+        return self._load(key)
+
+    def __getitem__(self, key: str):
+        if (entry := self.get(key, _MISSING)) is _MISSING:
+            raise KeyError(key)
+        return entry
+
+    def __setitem__(self, key: str, entry):
+        self.entries[key] = entry
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries or key in self.paths
+
+    def __len__(self) -> int:
+        return len(self.paths.keys() | self.entries.keys())
+
+    def keys(self) -> list[str]:
+        return list(self.paths.keys() | self.entries.keys())
+
+    def loaded(self) -> int:
+        return len(self.entries)
+
+    def memory(self, measure: Callable[[Any], int]) -> int:
+        """Bytes held by the decoded entries, measure(entry) sizes one entry"""
+        return sum(measure(entry) for entry in self.entries.values() if entry is not None)
+
+    def _warm(self, keys: list[str]):
+        for key in keys:
+            with self.lock:
+                if key in self.entries or key in self.decoded or key not in self.paths:
+                    continue
+                try:
+                    self.decoded[key] = self.decode(self.paths[key])
+                except Exception:
+                    # Left for get to decode again and raise on the main thread
+                    pass
+
+    def warm(self, names: list[str] = None, everything: bool = True, background: bool = True) -> threading.Thread:
+        """Decode entries ahead of use, names first in order and then the rest when everything is set.
+        Runs on a daemon thread, or inline under wasm or when background is off"""
+        keys = list(names or [])
+        if everything:
+            keys += [key for key in self.paths if key not in keys]
+        if not background or sys.platform == "emscripten":
+            for key in keys:
+                self.get(key)
+            return None
+        self.thread = threading.Thread(target=self._warm, args=(keys,), daemon=True)
+        self.thread.start()
+        return self.thread
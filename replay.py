@@ -0,0 +1,104 @@
+import gzip
+import marshal
+import random
+import struct
+import time
+import pygame
+from pygame.event import Event
+from pygame.key import ScancodeWrapper
+import shared
+
+MAGIC = b"SCRR"
+VERSION = 2
+HEADER = struct.Struct("<4sHq")
+FRAME = struct.Struct("<dhhBHH")
+KEY = struct.Struct("<H")
+EVENT = struct.Struct("<HI")
+BUDGET = struct.Struct("<I")
+
+
+def _pressed(keys) -> list[int]:
+    """Scancodes held down, the wrapper refuses iteration so its raw scancode table is read as a plain tuple"""
+    return [i for i, down in enumerate(tuple.__iter__(keys)) if down]
+
+
+class InputRecorder(object):
+    def __init__(self, path: str, seed: int = None):
+        """Write each frame's delta time, input state, events and how many budgeted tasks ran to a gzip log.
+        Seeds random so a replay with the same log makes the same choices"""
+        self.seed = time.time_ns() & 0x7fffffffffffffff if seed is None else seed
+        random.seed(self.seed)
+        self.file = gzip.open(path, "wb", compresslevel=6)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.seed))
+        self.frames = 0
+
+    def record(self, delta_time: float, events: list[Event]):
+        """Record a frame, call after shared.poll_input with the events the frame will handle"""
+        packed = []
+        for event in events:
+            try:
+                data = marshal.dumps(event.dict)
+            except ValueError:
+                # Events carrying objects, e.g. joystick instances, are left out
+                continue
+            packed.append(EVENT.pack(event.type, len(data)) + data)
+        keys = _pressed(shared.keys_pressed)
+        buttons = 0
+        for i, down in enumerate(shared.mouse_buttons):
+            if down:
+                buttons |= 1 << i
+        mx, my = shared.mouse_pos
+        write = self.file.write
+        write(FRAME.pack(delta_time, int(mx), int(my), buttons, len(keys), len(packed)))
+        for key in keys:
+            write(KEY.pack(key))
+        for data in packed:
+            write(data)
+        self.frames += 1
+
+    def end_frame(self, budget_ran: int):
+        """Finish the frame from record with scheduler.budget_ran, replays run that many budgeted tasks"""
+        self.file.write(BUDGET.pack(budget_ran))
+
+    def close(self):
+        self.file.close()
+
+
+class InputReplayer(object):
+    def __init__(self, path: str):
+        """Read back a log from InputRecorder one frame at a time. budget_runs is the number of budgeted tasks the
+        frame ran when it was recorded, for scheduler.budget_runs so the wall clock doesn't decide what is deferred"""
+        self.file = gzip.open(path, "rb")
+        magic, version, self.seed = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} input log")
+        random.seed(self.seed)
+        self.key_count = len(pygame.key.get_pressed())
+        self.frames = 0
+        self.budget_runs: int = None
+
+    def next_frame(self) -> tuple[float, list[Event]] | None:
+        """Set shared's input state for the next frame, returns its delta time and events or None at the end"""
+        read = self.file.read
+        data = read(FRAME.size)
+        if len(data) < FRAME.size:
+            return None
+        delta_time, mx, my, buttons, key_count, event_count = FRAME.unpack(data)
+        keys = [False] * self.key_count
+        for _ in range(key_count):
+            keys[KEY.unpack(read(KEY.size))[0]] = True
+        events = []
+        for _ in range(event_count):
+            event_type, size = EVENT.unpack(read(EVENT.size))
+            events.append(Event(event_type, marshal.loads(read(size))))
+        if len(data := read(BUDGET.size)) < BUDGET.size:
+            return None
+        self.budget_runs = BUDGET.unpack(data)[0]
+        shared.keys_pressed = ScancodeWrapper(keys)
+        shared.mouse_buttons = tuple(bool(buttons & (1 << i)) for i in range(len(shared.mouse_buttons)))
+        shared.mouse_pos = (mx, my)
+        self.frames += 1
+        return delta_time, events
+
+    def close(self):
+        self.file.close()
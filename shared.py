@@ -10,11 +10,17 @@ from pygame import Vector2, Surface, Rect, RLEACCEL, Channel
 from pygame.sprite import Sprite
 from pymunk import pygame_util
 import definitions
+from asset_cache import AssetCache
+from registry import LazyRegistry
+from atlas import Atlas
+from gif_stream import GifStream
+from mixer import MixerManager
 
 main_dir: AnyStr = os.path.split(os.path.abspath(__file__))[0]
 image_dir: LiteralString = os.path.join(main_dir, 'assets', 'images')
 audio_dir: LiteralString = os.path.join(main_dir, 'assets', 'audio')
 gif_dir: LiteralString = os.path.join(main_dir, 'assets', 'gif')
+asset_cache_dir: LiteralString = os.path.join(main_dir, '.asset_cache')
 
 pymunk.pygame_util.positive_y_is_up = True
 debug = False
@@ -31,13 +37,38 @@ delta_time = 0
 delta_slowdown = 1000
 camera_lag = 2
 space_delta_time = 1 / fps
+fixed_timestep = False
+physics_step = 1 / 60
+physics_max_substeps = 5
+physics_alpha = 1.0
+physics_profile: dict = {}
+task_budget = 0.75
+dirty_rendering = False
+dirty_rect_limit = 64
+dirty_full = True
+dirty_rects: list[Rect] = []
+headless = os.environ.get("SCRIPTER_HEADLESS", "0") != "0"
+headless_delta_time = 1 / 60
+frame_limit = int(os.environ.get("SCRIPTER_FRAMES", 0))
+time_limit = float(os.environ.get("SCRIPTER_TIME_LIMIT", 0))
+preload = True
+atlas_images = False
+gif_stream_bytes = 64 * 2 ** 20
+gif_stream_frames = 16
+sound_channels = {"effects": 12, "ui": 4}
+sound_voices = 4
+record_path = os.environ.get("SCRIPTER_RECORD", "")
+replay_path = os.environ.get("SCRIPTER_REPLAY", "")
+keys_pressed: tuple = ()
+mouse_buttons: tuple[bool, ...] = (False, False, False)
+mouse_pos: tuple[int, int] = (0, 0)
 clock = pygame.time.Clock()
 
+if headless:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
 pygame.init()
 
-image_registry: defaultdict[str, tuple[Surface, Rect]] = defaultdict()
-sound_registry: defaultdict[str, Sound] = defaultdict()
-gif_registry: defaultdict[str, list[Surface]] = defaultdict()
 definition_registry: defaultdict[str, dict] = defaultdict()
 
 screen = pygame.display.set_mode(screen_size)
@@ -60,11 +91,73 @@ def local_to_world_pos(pos):
     return Vector2(pos) + camera_topleft
 
 
+def mark_dirty(rect=None, screen=False):
+    """Mark an area drawn by a task for redraw in dirty rendering mode, None redraws everything.
+    Rects are in canvas coordinates, or screen coordinates with screen=True"""
+    global dirty_full
+    if not dirty_rendering:
+        return
+    if rect is None:
+        dirty_full = True
+    elif screen:
+        dirty_rects.append(Rect(rect).move(screen_rect.topleft))
+    else:
+        dirty_rects.append(Rect(rect))
+
+
+def poll_input():
+    """Read the keyboard and mouse once per frame, tasks use keys_pressed, mouse_buttons and mouse_pos so
+    recorded input can be replayed"""
+    global keys_pressed, mouse_buttons, mouse_pos
+    keys_pressed = pygame.key.get_pressed()
+    mouse_buttons = pygame.mouse.get_pressed()
+    mouse_pos = pygame.mouse.get_pos()
+
+
+poll_input()
+
+
 def get_mouse_pos():
-    return local_to_world_pos(pygame.mouse.get_pos())
+    return local_to_world_pos(mouse_pos)
+
+
+asset_cache: AssetCache = AssetCache(asset_cache_dir)
+
+
+def decode_image_rgba(path: str, scale=1) -> list[tuple[bytes, tuple[int, int]]]:
+    img = pygame.image.load(path)
+    if scale != 1:
+        size = img.get_size()
+        img = pygame.transform.scale(img, (size[0] * scale, size[1] * scale))
+    return [(pygame.image.tobytes(img, "RGBA"), img.get_size())]
+
+
+def decode_image(path: str) -> Surface:
+    """Scaled RGBA pixels of an image, baked to the asset cache"""
+    scale = image_options.get(os.path.basename(path).split('.')[0], (None, 1))[1]
+    data, size = asset_cache.load(path, scale, lambda p: decode_image_rgba(p, scale))[0]
+    return pygame.image.frombuffer(data, size, "RGBA")
+
+
+def finish_image(name_key: str, img: Surface) -> tuple[Surface, Rect]:
+    color_key = image_options.get(name_key, (None, 1))[0]
+    img = img.convert_alpha()
+    if color_key is not None:
+        if color_key == -1:
+            color_key = img.get_at((0, 0))
+        img.set_colorkey(color_key, RLEACCEL)
+    if atlas_images:
+        img = atlas.add(img)
+    return img, img.get_rect()
+
+
+atlas: Atlas = Atlas()
+image_options: dict[str, tuple] = {}
+image_registry: LazyRegistry = LazyRegistry(decode_image, finish_image)
 
 
 def load_image(img: str | list[str], color_key=None, scale=1):
+    """Index images, they are decoded on first use"""
     n = None
     if isinstance(img, str):
         n = [img]
@@ -72,101 +165,154 @@ def load_image(img: str | list[str], color_key=None, scale=1):
         n = img
     if n:
         for name in n:
-            name_key = name.split('.')[0]
-            img = pygame.image.load(os.path.join(image_dir, name)).convert_alpha()
-            size = img.get_size()
-            img = pygame.transform.scale(img, (size[0] * scale, size[1] * scale))
-            if color_key is not None:
-                if color_key == -1:
-                    color_key = img.get_at((0, 0))
-                img.set_colorkey(color_key, RLEACCEL)
-            image_registry[name_key] = (img, img.get_rect())
+            image_options[name.split('.')[0]] = (color_key, scale)
+        image_registry.index(image_dir, n)
 
 
 load_image([i for i in os.listdir(image_dir) if not i.__contains__("__")])
 
 
-def get_image(i_name: str, **kwargs) -> tuple[Surface, Rect]:
+fallback_images: dict[tuple, Surface] = {}
+
+
+def get_image(i_name: str, copy=False, **kwargs) -> tuple[Surface, Rect]:
+    """Image and a new rect for it. The surface is shared with every other user of the image, don't draw into it
+    unless copy is set. Unknown names get a shared plain image of image_size and image_color"""
     if i := image_registry.get(i_name, None):
         s, r = i
-        return s.copy(), r.copy()
-    else:
-        s = Surface(kwargs.get("image_size", (64, 64))).convert_alpha()
-        s.fill(kwargs.get("image_color", (255, 0, 255, 255)))
-        return s, s.get_rect()
+        return (s.copy() if copy else s), r.copy()
+    size = kwargs.get("image_size", (64, 64))
+    color = kwargs.get("image_color", (255, 0, 255, 255))
+    key = (int(size[0]), int(size[1]), tuple(pygame.Color(color)))
+    if (s := fallback_images.get(key)) is None:
+        s = Surface(size).convert_alpha()
+        s.fill(color)
+        s = fallback_images[key] = atlas.add(s) if atlas_images else s
+    return (s.copy() if copy else s), s.get_rect()
+
+
+def decode_sound(path: str) -> Sound:
+    if not pygame.mixer:
+        return None
+    return pygame.mixer.Sound(path)
+
+
+sound_registry: LazyRegistry = LazyRegistry(decode_sound)
 
 
 def load_sound(sound: str | list[str]):
+    """Index sounds, they are decoded on first use"""
     s = None
     if isinstance(sound, str):
         s = [sound]
     elif isinstance(sound, list) and all([isinstance(i, str) for i in sound]):
         s = sound
     if s:
-        for name in s:
-            name_key = name.split('.')[0]
-            if not pygame.mixer:
-                s = None
-            else:
-                s = pygame.mixer.Sound(os.path.join(audio_dir, name))
-            sound_registry[name_key] = s
+        sound_registry.index(audio_dir, s)
 
 
 load_sound([i for i in os.listdir(audio_dir) if not i.__contains__("__")])
 
 
+mixer_manager: MixerManager = MixerManager(sound_channels, sound_voices)
+
+
 def get_sound(name: str) -> Sound:
-    sound = sound_registry.get(name, None)
-    if sound:
-        sound.fadeout(0)
-        sound.set_volume(volume)
-    return sound
+    return sound_registry.get(name, None)
 
 
-def play_sound(name: str | Sound) -> Channel:
+def play_sound(name: str | Sound, loops: int = 0, priority: int = None) -> Channel:
+    """Play through mixer_manager under the sound's options, see MixerManager.configure"""
     if isinstance(name, str):
         sound = get_sound(name)
     elif isinstance(name, Sound):
         sound = name
     else:
         return None
-    channel = None
-    if sound:
-        sound.fadeout(0)
-        sound.set_volume(volume)
-        channel = sound.play()
-    return channel
+    mixer_manager.set_volume(volume)
+    return mixer_manager.play(name, sound, loops, priority)
+
+
+def decode_gif_rgba(path: str) -> list[tuple[bytes, tuple[int, int]]]:
+    """RGBA bytes of every frame, PIL only so it can run on a worker thread"""
+    frames = []
+    loaded_gif: GifImageFile
+    with Image.open(path) as loaded_gif:
+        for frame_index in range(loaded_gif.n_frames):
+            loaded_gif.seek(frame_index)
+            frame_rgba = loaded_gif.convert("RGBA")
+            frames.append((frame_rgba.tobytes(), frame_rgba.size))
+    return frames
+
+
+def decode_gif(path: str) -> list[tuple[bytes | memoryview, tuple[int, int]]] | GifStream:
+    """RGBA frames through the asset cache, or a GifStream when they would take more than gif_stream_bytes"""
+    if gif_stream_bytes:
+        # Baked frames know their size, only gifs not in the cache have their frames counted (a read of the file)
+        if (frames := asset_cache.cached(path, 1)) is not None:
+            if sum(len(data) for data, _ in frames) <= gif_stream_bytes:
+                return frames
+        with Image.open(path) as gif:
+            length = getattr(gif, "n_frames", 1)
+            decoded_bytes = gif.size[0] * gif.size[1] * 4 * length
+        if decoded_bytes > gif_stream_bytes:
+            return GifStream(path, gif_stream_frames, length=length)
+    return asset_cache.load(path, 1, decode_gif_rgba)
+
+
+def finish_gif(name_key: str, frames: list[tuple[bytes, tuple[int, int]]] | GifStream) -> list[Surface] | GifStream:
+    if isinstance(frames, GifStream):
+        return frames
+    surfaces = []
+    for data, size in frames:
+        if isinstance(data, memoryview):
+            # Frames mapped from the asset cache are used in place
+            pygame_image = pygame.image.frombuffer(data, size, "RGBA")
+        else:
+            pygame_image = pygame.image.frombytes(data, size, "RGBA")
+        pygame_image.set_colorkey((255, 255, 255, 255))
+        surfaces.append(atlas.add(pygame_image) if atlas_images else pygame_image)
+    return surfaces
+
+
+gif_registry: LazyRegistry = LazyRegistry(decode_gif, finish_gif)
 
 
 def load_gif(gif: str | list[str]):
+    """Index gifs, their frames are decoded on first use"""
     g = None
     if isinstance(gif, str):
         g = [gif]
     elif isinstance(gif, list) and all([isinstance(i, str) for i in gif]):
         g = gif
     if g:
-        for name in g:
-            name_key = name.split('.')[0]
-            surfaces = []
-            loaded_gif: GifImageFile = Image.open(os.path.join(gif_dir, name))
-            for frame_index in range(loaded_gif.n_frames):
-                loaded_gif.seek(frame_index)
-                frame_rgba = loaded_gif.convert("RGBA")
-                pygame_image = pygame.image.frombytes(
-                    frame_rgba.tobytes(), frame_rgba.size, frame_rgba.mode
-                )
-                pygame_image.set_colorkey((255, 255, 255, 255))
-                surfaces.append(pygame_image)
-            gif_registry[name_key] = surfaces
+        gif_registry.index(gif_dir, g)
 
 
-def get_gif(name: str) -> list[Surface]:
-    return [surf.copy() for surf in gif_registry.get(name, [])]
+def get_gif(name: str, copy=False) -> list[Surface] | GifStream:
+    """Frames of a gif, shared with every other user unless copy is set. Gifs over gif_stream_bytes come as a
+    GifStream that decodes frames as they are indexed, readers that keep their own play position take cursor()"""
+    frames = gif_registry.get(name, [])
+    if isinstance(frames, GifStream):
+        return GifStream(frames.path, gif_stream_frames, length=frames.length) if copy else frames
+    return [surf.copy() for surf in frames] if copy else list(frames)
 
 
 load_gif([i for i in os.listdir(gif_dir) if not i.__contains__("__")])
 
 
+def bake_assets():
+    """Decode every registry entry now, writing the asset cache for the next start"""
+    for registry in (image_registry, gif_registry):
+        registry.warm(background=False)
+
+
+def preload_assets(images: list[str] = None, gifs: list[str] = None, sounds: list[str] = None, everything=True):
+    """Decode registry entries on background threads ahead of use, the named ones first"""
+    return [image_registry.warm(images, everything), gif_registry.warm(gifs, everything),
+            sound_registry.warm(sounds, everything)]
+
+
 def load_definitions():
     vd = vars(definitions)
     def_list = [(i, vd[i]) for i in vd if "__" not in i and isinstance(vd, dict)]
@@ -181,6 +327,25 @@ def get_definition(name: str):
 load_definitions()
 
 
+def surface_bytes(surface: Surface) -> int:
+    if surface.get_parent() is not None:
+        # Atlas entries, their pixels are counted with the atlas pages
+        return 0
+    return surface.get_pitch() * surface.get_height()
+
+
+def asset_memory() -> dict[str, int]:
+    """Pixel bytes held by each registry, counting only entries that were decoded. Entries packed into the atlas
+    are counted once under atlas"""
+    return {
+        "images": image_registry.memory(lambda i: surface_bytes(i[0])),
+        "gifs": gif_registry.memory(lambda frames: frames.memory() if isinstance(frames, GifStream)
+                                    else sum(surface_bytes(f) for f in frames)),
+        "fallbacks": sum(surface_bytes(s) for s in fallback_images.values()),
+        "atlas": atlas.memory()
+    }
+
+
 def get_plain_sprite(img: str, **kwargs) -> Sprite:
     """ Get a plain sprite, kwargs are params for shared.get_image """
     sprite: Sprite = Sprite()
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+_pool: ProcessPoolExecutor = None
+
+
+def _init_worker():
+    """Workers run without a window or audio device"""
+    os.environ.setdefault("SCRIPTER_HEADLESS", "1")
+
+
+def level_metrics(level) -> dict:
+    """Small summary of a level's dynamic bodies, cheap to send back from a worker"""
+    from pymunk import Body
+    bodies = [b for b in level.space.bodies if b.body_type == Body.DYNAMIC]
+    speed = sum(b.velocity.length for b in bodies) / len(bodies) if bodies else 0.0
+    return {
+        "sprites": len(level),
+        "bodies": len(bodies),
+        "sleeping": sum(1 for b in bodies if b.is_sleeping),
+        "mean_speed": speed
+    }
+
+
+def simulate(setup: Callable, steps: int, dt: float = 1 / 60, args=(), physics_profile: dict = None,
+             metrics: Callable = level_metrics) -> dict:
+    """Run one level in this process, setup(level, *args) fills it before it is updated steps times.
+    Returns the metrics(level) dict with the steps and seconds it took"""
+    import shared
+    from level import Level, set_level
+    level = Level(physics_profile=physics_profile)
+    previous = set_level(level)
+    delta_time, space_delta_time = shared.delta_time, shared.space_delta_time
+    shared.delta_time = shared.space_delta_time = dt
+    try:
+        setup(level, *args)
+        start = time.perf_counter()
+        for _ in range(steps):
+            level.update()
+        result = metrics(level)
+        result["steps"] = steps
+        result["seconds"] = time.perf_counter() - start
+        return result
+    finally:
+        shared.delta_time, shared.space_delta_time = delta_time, space_delta_time
+        set_level(previous)
+
+
+def spawn_pool(workers: int = None) -> ProcessPoolExecutor:
+    """Process pool whose workers are spawned headless, forking would copy the game's display, audio and threads"""
+    return ProcessPoolExecutor(workers, multiprocessing.get_context("spawn"), initializer=_init_worker)
+
+
+def get_simulation_pool(workers: int = None) -> ProcessPoolExecutor:
+    """Process pool for simulations, see spawn_pool"""
+    global _pool
+    if _pool is None:
+        _pool = spawn_pool(workers)
+    return _pool
+
+
+def shutdown_simulation_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+def run_simulations(setup: Callable, steps: int, args_list: list, dt: float = 1 / 60, physics_profile: dict = None,
+                    metrics: Callable = level_metrics, workers: int = None) -> list[dict]:
+    """Run one independent level per entry of args_list across the simulation pool, results are in the same order.
+    setup and metrics must be module level functions so they can be sent to the workers.
+    Under wasm there are no processes and the levels run one after another"""
+    if sys.platform == "emscripten":
+        return [simulate(setup, steps, dt, args, physics_profile, metrics) for args in args_list]
+    pool = get_simulation_pool(workers)
+    futures = [pool.submit(simulate, setup, steps, dt, args, physics_profile, metrics) for args in args_list]
+    return [future.result() for future in futures]
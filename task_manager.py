@@ -1,10 +1,19 @@
+import heapq
+import itertools
 import math
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 import pygame
 from pygame import Vector2, Surface, Rect
 from pygame.sprite import Sprite
 import shared
-from typing import Callable
-from level import level
+from typing import Any, Callable
+from level import current_level, track
+from gif_stream import GifStream
+from profiler import TaskProfiler
+from simulation import spawn_pool
 import util
 
 TT_TASK = 0
@@ -12,11 +21,24 @@ TT_DRAW = 1
 TT_OVERLAY = 2
 TT_SCREEN = 3
 
+PRIORITY_IDLE = 0
+PRIORITY_LOW = 1
+PRIORITY_NORMAL = 2
+
 
 class Task(object):
     end = 0
     cont = 1
     wait = 2
+    park = 3
+
+    delay: float = 0
+    delay_ticks: int = 0
+    wake_time: float = 0
+    wake_frame: int = 0
+    priority: int = PRIORITY_NORMAL
+    cost: float = 0
+    pooled: bool = False
 
     def __init__(self, task_func, params=([], {})):
         self.task_func: Callable[[Task, list, dict], int] = task_func
@@ -26,13 +48,35 @@ class Task(object):
     def execute(self):
         return self.task_func(self, *self.args, **self.kwargs)
 
+    def sleep(self, time: float) -> int:
+        """Park the task for a time, return the result from the task func"""
+        self.delay = time
+        self.delay_ticks = 0
+        return Task.park
+
+    def sleep_ticks(self, ticks: int) -> int:
+        """Park the task for a number of frames, return the result from the task func"""
+        self.delay = 0
+        self.delay_ticks = ticks
+        return Task.park
+
+    def sleep_as(self, other) -> int:
+        """Park the task for the same delay as another parked task"""
+        self.delay = other.delay
+        self.delay_ticks = other.delay_ticks
+        return Task.park
+
+    def set_priority(self, priority: int, cost: float = 0):
+        """Below PRIORITY_NORMAL a TT_TASK is deferred once the frame budget is used, cost is a time hint"""
+        self.priority = priority
+        self.cost = cost
+        return self
+
     def start(self, task_type=TT_TASK):
-        _tasks[task_type].append(self)
+        scheduler.add(self, task_type)
 
     def bind(self, binding: int):
-        if binding not in _bindings:
-            _bindings[binding] = []
-        _bindings[binding].append(self)
+        scheduler.bind(self, binding)
 
 
 class CameraUpdate(Task):
@@ -70,32 +114,23 @@ class CameraFollow(Task):
 class LerpPosition(Task):
     def __init__(self, sprite: Sprite, target: Sprite | Vector2, looping: bool = False,
                  move_speed: float = 300, params=([], {})):
+        """Moves through tween.tween_system, this task starts the tween and waits on it so it still sequences"""
+        from tween import tween_system
+        started = [False]
+
         def update(task):
-            if not sprite.alive():
+            if not sprite.alive() or isinstance(target, Sprite) and not target.alive():
+                tween_system.cancel(sprite)
                 return task.end
-            if isinstance(target, Sprite):
-                if not target.alive():
-                    return task.end
-                target_pos = Vector2(target.rect.center)
-            elif isinstance(target, Vector2):
-                target_pos = target
-            else:
+            if not started[0]:
+                started[0] = True
+                tween_system.lerp_position(sprite, target, move_speed, looping=looping)
+            elif not tween_system.is_active(sprite):
                 return task.end
-            center = Vector2(sprite.rect.center)
-            direction = target_pos - center
-
-            if direction.length() < 0.5:
-                sprite.rect.center = center
-                if looping:
+            if looping:
+                target_pos = target.rect.center if isinstance(target, Sprite) else target
+                if Vector2(sprite.rect.center).distance_squared_to(target_pos) < 0.25:
                     return task.cont
-                return task.end
-            else:
-                dvn = direction.normalize()
-
-            dx = dvn * move_speed * shared.delta_time
-            dy = dvn * move_speed * shared.delta_time
-            dv = Vector2(dx, dy)
-            sprite.rect.center = center + dv
             return task.wait
 
         super().__init__(update, params)
@@ -104,9 +139,10 @@ class LerpPosition(Task):
 class LerpRotation(Task):
     def __init__(self, sprite: Sprite, target: Sprite | Vector2, looping: bool = False,
                  rotation_speed: float = 10, rotation_lag=1, params=([], {})):
+        track(sprite)
 
         if not hasattr(sprite, "original_image"):
-            sprite.original_image = sprite.image.copy()
+            sprite.original_image = sprite.image
 
         if not hasattr(sprite, "angle"):
             sprite.angle = 0
@@ -128,7 +164,7 @@ class LerpRotation(Task):
             if not util.angles_equal(target_angle, sprite.angle, 0.5):
                 angle = util.lerp_angle(sprite.angle, target_angle, rotation_speed * shared.delta_time, rotation_lag)
                 sprite.angle = angle
-                sprite.image, sprite.rect = util.rotate_image(sprite.original_image, angle, center)
+                sprite.image, sprite.rect = util.rotate_image_cached(sprite.original_image, angle, center)
                 return task.wait
             else:
                 if looping:
@@ -140,9 +176,10 @@ class LerpRotation(Task):
 
 class SimpleRotate(Task):
     def __init__(self, sprite: Sprite, rotation_speed=100, params=([], {})):
+        track(sprite)
 
         if not hasattr(sprite, "original_image"):
-            sprite.original_image = sprite.image.copy()
+            sprite.original_image = sprite.image
 
         if not hasattr(sprite, "angle"):
             sprite.angle = 0
@@ -152,7 +189,8 @@ class SimpleRotate(Task):
                 return task.end
             sprite.angle += rotation_speed * shared.delta_time
             sprite.angle %= 360
-            sprite.image, sprite.rect = util.rotate_image(sprite.original_image, sprite.angle, sprite.rect.center)
+            sprite.image, sprite.rect = util.rotate_image_cached(sprite.original_image, sprite.angle,
+                                                                 sprite.rect.center)
             return task.cont
 
         super().__init__(update, params)
@@ -160,15 +198,19 @@ class SimpleRotate(Task):
 
 class FloatMovement(Task):
     def __init__(self, sprite: Sprite, cos_amp=25, cos_speed=0.01, sin_amp=25, sin_speed=0.01, params=([], {})):
-
-        start_pos = Vector2(sprite.rect.center)
+        """Moves through tween.tween_system, this task starts the tween and ends with it"""
+        from tween import tween_system
+        started = [False]
 
         def update(task):
             if not sprite.alive():
+                tween_system.cancel(sprite)
+                return task.end
+            if not started[0]:
+                started[0] = True
+                tween_system.float_movement(sprite, cos_amp, cos_speed, sin_amp, sin_speed)
+            elif not tween_system.is_active(sprite):
                 return task.end
-            dx = util.float_movement_cos(cos_amp, cos_speed)
-            dy = util.float_movement_sin(sin_amp, sin_speed)
-            sprite.rect.center = start_pos + Vector2(dx, dy)
             return task.cont
 
         super().__init__(update, params)
@@ -222,22 +264,22 @@ class DelayTask(CountTask):
 class TickWait(DelayTask):
     def __init__(self, ticks: int, params=([], {})):
         def tick(task):
-            self.counter += 1
-            if self.counter == ticks:
-                self.counter = 0
-                return task.cont
-            return task.wait
+            if not self.counter and 1 < ticks:
+                self.counter = 1
+                return task.sleep_ticks(ticks - 1)
+            self.counter = 0
+            return task.cont
         super().__init__(tick, params)
 
 
 class TimeWait(DelayTask):
     def __init__(self, time: float, params=([], {})):
         def update(task):
-            self.counter += shared.delta_time
-            if time <= self.counter:
-                self.counter = 0
-                return task.cont
-            return task.wait
+            if not self.counter:
+                self.counter = 1
+                return task.sleep(time)
+            self.counter = 0
+            return task.cont
         super().__init__(update, params)
 
 
@@ -247,29 +289,29 @@ class PlaySound(CountTask):
 
         def play_sound(task):
             if s_data[0]:
-                shared.play_sound(s_data[1])
-                self.counter = s_data[1].get_length()
+                shared.play_sound(sound_name)
                 s_data[0] = False
                 return task.cont
             else:
                 if looping:
-                    self.counter -= shared.delta_time
-                    if self.counter < 0:
-                        self.counter = 0
-                        s_data[0] = True
-                    return task.wait
+                    s_data[0] = True
+                    return task.sleep(s_data[1].get_length())
                 return task.end
         super().__init__(play_sound, params)
 
 
 class GifAnimation(CountTask):
-    def __init__(self, sprite: Sprite, gif: str | list[Surface], gif_speed: float = 1, looping: bool = True,
-                 params=([], {})):
+    def __init__(self, sprite: Sprite, gif: str | list[Surface] | GifStream, gif_speed: float = 1,
+                 looping: bool = True, params=([], {})):
+        track(sprite)
         g = None
         if isinstance(gif, str):
             g = shared.get_gif(gif)
-        elif isinstance(gif, list) and util.is_all_of_type(gif, Surface):
+        elif isinstance(gif, GifStream) or (isinstance(gif, list) and util.is_all_of_type(gif, Surface)):
             g = gif
+        if isinstance(g, GifStream):
+            # Own play position and read ahead, decoded frames stay shared with other readers
+            g = g.cursor()
 
         def update(task):
             if not sprite.alive() or g is None:
@@ -290,36 +332,34 @@ class GifAnimation(CountTask):
         super().__init__(update, params)
 
 
-class CircleFollow(CountTask):
+class CircleFollow(Task):
     def __init__(self, sprite: Sprite, target_sprite: Sprite, radius: float = 100, move_speed: float = 300,
                  clockwise=True, step_size: int = 10, looping: bool = False, params=([], {})):
-        move_speed = abs(move_speed)
-        i = 1 if clockwise else -1
-        sprite.rect.center = Vector2(target_sprite.rect.center[0] + math.cos(0) * radius,
-                                     target_sprite.rect.center[1] + math.sin(0) * radius)
+        """Moves through tween.tween_system, step_size turns at move_speed * step_size degrees per second"""
+        from tween import tween_system
+        sprite.rect.center = Vector2(target_sprite.rect.center[0] + radius, target_sprite.rect.center[1])
+        started = [False]
 
         def update(task):
             if not sprite.alive() or not target_sprite.alive():
+                tween_system.cancel(sprite)
                 return task.end
-            center = Vector2(target_sprite.rect.center)
-            self.counter += move_speed * shared.delta_time
-            if self.counter < 360:
-                r_angle = math.radians(self.counter * i) * step_size
-                x = center.x + math.cos(r_angle) * radius
-                y = center.y + math.sin(r_angle) * radius
-                sprite.rect.center = Vector2(x, y)
-            else:
-                if looping:
-                    self.counter %= 360
-                    return task.wait
+            if not started[0]:
+                started[0] = True
+                tween_system.circle_follow(sprite, target_sprite, radius, abs(move_speed) * step_size, clockwise,
+                                           None if looping else step_size)
+            elif not tween_system.is_active(sprite):
                 return task.end
             return task.cont
+
         super().__init__(update, params)
 
 
 class LerpLineTask(CountTask):
     def __init__(self, sprite: Sprite, line: list[Vector2], move_speed: float = 300, looping: bool = False,
                  params=([], {})):
+        track(sprite)
+
         def update(task):
             if not sprite.alive():
                 return task.end
@@ -362,6 +402,7 @@ class LerpPositionCircle(LerpLineTask):
 class ScrollingText(CountTask):
     def __init__(self, sprite: Sprite, text: str | list[tuple[Surface, Rect]], speed=100, on_letter: Task = None,
                  skip: Task = None, on_end: Task = None, params=([], {}), **kwargs):
+        track(sprite)
         gif = [0, [], False]
 
         if isinstance(text, str):
@@ -417,7 +458,7 @@ class ImageTransition(CountTask):
                     i.fill((0, 0, 0, util.map_range_clamped(self.counter, self.timer_h, 0, 0, 255)))
                 j = surface.copy()
                 j.blit(i, (0, 0))
-                level.background = j
+                current_level().background = j
                 return task.wait
             elif self.counter < 0:
                 self.counter = 0
@@ -449,78 +490,623 @@ class FadeTransition(CountTask):
                 a = util.map_range_clamped(self.counter, total_time, fade_out, 0, 255)
             i.fill((*color, a))
             shared.screen.blit(i, (0, 0))
+            shared.mark_dirty(i.get_rect(), True)
             return task.wait
 
         super().__init__(update, params)
 
 
+class PooledTask(Task):
+    pooled = True
+
+    def __init__(self):
+        """Task that is reused through task_pool, get one with task_pool.acquire(cls, *args).
+        Once started, the scheduler releases it back to the pool when it ends"""
+        self.in_pool = False
+        super().__init__(None)
+
+    def reinit(self, *args, **kwargs):
+        """Set the task up for a new use, takes the args given to task_pool.acquire"""
+        self.counter = 0
+        self.delay = 0
+        self.delay_ticks = 0
+        self.wake_time = 0
+        self.wake_frame = 0
+
+    def reset(self):
+        """Drop references held by the task when it goes back into the pool"""
+        pass
+
+    def update(self) -> int:
+        return Task.end
+
+    def execute(self):
+        return self.update()
+
+
+class LerpPositionLinePooled(PooledTask):
+    def reinit(self, sprite: Sprite, start: Vector2, destination: Vector2, move_speed: float = 300,
+               looping: bool = False):
+        """Pooled LerpPositionLine, the line is walked without building a point list"""
+        super().reinit()
+        track(sprite)
+        self.sprite = sprite
+        self.move_speed = move_speed
+        self.looping = looping
+        self.x = start[0]
+        self.y = start[1]
+        dx = destination[0] - self.x
+        dy = destination[1] - self.y
+        length = math.hypot(dx, dy)
+        self.length = int(length)
+        self.dx = dx / length if length else 0
+        self.dy = dy / length if length else 0
+
+    def reset(self):
+        self.sprite = None
+
+    def update(self):
+        sprite = self.sprite
+        if not sprite.alive():
+            return Task.end
+        if self.move_speed < 0 and self.counter == 0:
+            self.counter = self.length
+        self.counter += self.move_speed * shared.delta_time
+        if 0 <= self.counter < self.length:
+            step = int(self.counter) + 1
+            sprite.rect.centerx = self.x + self.dx * step
+            sprite.rect.centery = self.y + self.dy * step
+            return Task.wait
+        if not self.looping or not self.length:
+            return Task.end
+        self.counter %= self.length
+        return Task.cont
+
+
+class DestroySpritePositionPooled(PooledTask):
+    def reinit(self, sprite: Sprite, target: Sprite | Vector2, threshold: float = 0.5):
+        """Pooled DestroySpritePosition"""
+        super().reinit()
+        self.sprite = sprite
+        self.target = target
+        self.threshold = threshold * threshold
+
+    def reset(self):
+        self.sprite = None
+        self.target = None
+
+    def update(self):
+        sprite = self.sprite
+        target = self.target
+        if not sprite.alive():
+            return Task.end
+        if isinstance(target, Sprite):
+            if not target.alive():
+                return Task.end
+            tx = target.rect.centerx
+            ty = target.rect.centery
+        elif isinstance(target, Vector2):
+            tx = target.x
+            ty = target.y
+        else:
+            return Task.end
+        dx = tx - sprite.rect.centerx
+        dy = ty - sprite.rect.centery
+        if dx * dx + dy * dy < self.threshold:
+            sprite.visible = 0
+            sprite.kill()
+            return Task.end
+        return Task.cont
+
+
+_executors: dict[bool, Executor] = {}
+
+
+def get_executor(processes: bool = False) -> Executor:
+    """Shared worker pool, a thread pool by default or a process pool spawned like the simulation pool"""
+    if (executor := _executors.get(processes)) is None:
+        executor = _executors[processes] = spawn_pool() if processes else ThreadPoolExecutor()
+    return executor
+
+
+def submit(func: Callable, *args, processes: bool = False, **kwargs) -> Future:
+    """Run a pure func in a worker pool, the func must not touch Surfaces or pymunk objects.
+    Under wasm there are no workers, the func runs inline and the future is already done"""
+    if sys.platform == "emscripten":
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return get_executor(processes).submit(func, *args, **kwargs)
+
+
+class OffloadTask(Task):
+    def __init__(self, func: Callable, args=(), on_done: Callable[[Any], None] = None, owner: Sprite = None,
+                 processes: bool = False, params=([], {})):
+        """Run a pure func in a worker pool and call on_done with the result on the main thread.
+        The work is cancelled and on_done skipped if the owner sprite dies first"""
+        self.future: Future = None
+        self.result = None
+
+        def update(task):
+            if owner is not None and not owner.alive():
+                self.cancel()
+                return task.end
+            if self.future is None:
+                self.future = submit(func, *args, processes=processes)
+            if not self.future.done():
+                return task.wait
+            future = self.future
+            self.future = None
+            try:
+                self.result = future.result()
+            except Exception as e:
+                util.log(e)
+                return task.end
+            if on_done is not None:
+                on_done(self.result)
+            return task.end
+
+        super().__init__(update, params)
+
+    def cancel(self):
+        """Cancel the work, a func that already started still finishes but its result is dropped"""
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+
+
+class _Step(object):
+    def __init__(self, value):
+        self.value = value
+
+    def __await__(self):
+        yield self.value
+
+
+_next_frame = _Step(None)
+
+
+def next_frame():
+    """Awaitable for async def tasks, resumes on the next frame"""
+    return _next_frame
+
+
+def delay(time: float):
+    """Awaitable for async def tasks, parks the task for a time"""
+    return _Step(float(time))
+
+
+def run_task(task: Task):
+    """Awaitable for async def tasks, runs a task until it returns cont or end"""
+    return _Step(task)
+
+
+class GeneratorTask(Task):
+    def __init__(self, task_func, params=([], {})):
+        """Task driven by a generator or async def func, yield a return code, None for next frame,
+        a float delay, a Task to run until cont or end, or a future to resume with its result"""
+        self.coro = None
+        self.child: Task = None
+        self.future = None
+        super().__init__(task_func, params)
+
+    def execute(self):
+        send = None
+        throw = None
+        if self.child is not None:
+            return_code = self.child.execute()
+            if return_code == Task.wait:
+                return Task.wait
+            if return_code == Task.park:
+                return self.sleep_as(self.child)
+            self.child = None
+        elif self.future is not None:
+            if not self.future.done():
+                return Task.wait
+            try:
+                send = self.future.result()
+            except BaseException as e:
+                throw = e
+            self.future = None
+        if self.coro is None:
+            self.coro = self.task_func(self, *self.args, **self.kwargs)
+        while True:
+            try:
+                if throw is not None:
+                    value = self.coro.throw(throw)
+                    throw = None
+                else:
+                    value = self.coro.send(send)
+            except StopIteration as e:
+                self.coro = None
+                return Task.end if e.value is None else e.value
+            send = None
+            if value is None:
+                return Task.wait
+            if isinstance(value, int):
+                return value
+            if isinstance(value, float):
+                return self.sleep(value)
+            if isinstance(value, Task):
+                return_code = value.execute()
+                if return_code == Task.wait:
+                    self.child = value
+                    return Task.wait
+                if return_code == Task.park:
+                    self.child = value
+                    return self.sleep_as(value)
+                continue
+            if hasattr(value, "done"):
+                if not value.done():
+                    self.future = value
+                    return Task.wait
+                try:
+                    send = value.result()
+                except BaseException as e:
+                    throw = e
+                continue
+            raise TypeError(f"GeneratorTask can not yield {value!r}")
+
+
 class Sequencer(object):
     def __init__(self, *seq_tasks):
         """Sequencer for game actions"""
         self.task_list: list[Task] = list(seq_tasks)
         self.current_idx: int = 0
         self.end_tasks: list[Task] = None
+        self.delay_count: int = sum(isinstance(t, DelayTask) for t in self.task_list)
+        self.active: list[Task] = None
 
     def on_end(self, *end_tasks):
         """Single execution end tasks"""
         self.end_tasks = list(end_tasks)
         return self
 
-    def build(self, looping: bool = False, parallel: bool = False, params=([], {})):
-        """Build the sequencer into a Task"""
-        def sequence(task):
-            if self.task_list and not util.is_all_of_type(self.task_list, DelayTask):
-                if not parallel:
-                    if self.current_idx == -1:
-                        self.current_idx = 0
-                    elif len(self.task_list) <= self.current_idx:
-                        if not looping:
-                            return Task.end
-                        self.current_idx = 0
-                    return_code = self.task_list[self.current_idx].execute()
-                    if return_code == Task.cont:
-                        self.current_idx += 1
-                    elif return_code == Task.end:
-                        del self.task_list[self.current_idx]
-                        self.current_idx -= 1
-                    return task.cont
+    def _remove(self, t: Task):
+        """Remove an ended task, it is not run again on later passes"""
+        self.task_list.remove(t)
+        if isinstance(t, DelayTask):
+            self.delay_count -= 1
+        if t.pooled:
+            task_pool.release(t)
+
+    def _finish(self, nested: bool) -> int:
+        """Run the end tasks and rewind, a nested sequencer continues its parent instead of ending"""
+        if self.end_tasks:
+            for t in self.end_tasks:
+                t.execute()
+            self.end_tasks = None
+        self.current_idx = 0
+        self.active = None
+        return Task.cont if nested else Task.end
+
+    def _step_sequential(self, task: Task, looping: bool, nested: bool) -> int:
+        if len(self.task_list) == self.delay_count:
+            return self._finish(nested)
+        if len(self.task_list) <= self.current_idx:
+            if not looping:
+                return self._finish(nested)
+            self.current_idx = 0
+        current = self.task_list[self.current_idx]
+        return_code = current.execute()
+        if return_code == Task.cont:
+            self.current_idx += 1
+        elif return_code == Task.end:
+            del self.task_list[self.current_idx]
+            if isinstance(current, DelayTask):
+                self.delay_count -= 1
+            if current.pooled:
+                task_pool.release(current)
+        elif return_code == Task.park:
+            return task.sleep_as(current)
+        return Task.wait
+
+    def _step_parallel(self, looping: bool, nested: bool) -> int:
+        if self.active is None:
+            self.active = list(self.task_list)
+        active = self.active
+        write = 0
+        for t in active:
+            if not scheduler.is_due(t):
+                active[write] = t
+                write += 1
+                continue
+            return_code = t.execute()
+            if return_code == Task.end:
+                self._remove(t)
+                continue
+            if return_code == Task.park:
+                scheduler.set_wake(t)
+            elif return_code == Task.cont and not looping:
+                # Joined, a non looping parallel pass ends once every task has returned cont or end
+                continue
+            active[write] = t
+            write += 1
+        del active[write:]
+        if looping:
+            if len(self.task_list) == self.delay_count:
+                return self._finish(nested)
+        elif not active:
+            return self._finish(nested)
+        return Task.wait
+
+    def build(self, looping: bool = False, parallel: bool = False, params=([], {}), nested: bool = False):
+        """Build the sequencer into a Task, a nested sequencer returns cont instead of end when done
+        so it can be used as a step in another sequencer"""
+        if parallel:
+            def sequence(task):
+                return self._step_parallel(looping, nested)
+        else:
+            def sequence(task):
+                return self._step_sequential(task, looping, nested)
+
+        return Task(sequence, params)
+
+
+class TaskPool(object):
+    def __init__(self, max_free: int = 4096):
+        """Free lists of PooledTask instances per class"""
+        self.free: dict[type, list[PooledTask]] = {}
+        self.max_free = max_free
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, task_class: type, *args, **kwargs):
+        """Get a pooled task of a class, set up with reinit(*args, **kwargs)"""
+        if free := self.free.get(task_class):
+            task = free.pop()
+            task.in_pool = False
+            self.reused += 1
+        else:
+            task = task_class()
+            self.created += 1
+        task.reinit(*args, **kwargs)
+        return task
+
+    def release(self, task: PooledTask):
+        """Put a pooled task back, it must not be used again by whoever released it"""
+        if task.in_pool:
+            return
+        task.reset()
+        task.in_pool = True
+        if (free := self.free.get(type(task))) is None:
+            free = self.free[type(task)] = []
+        if len(free) < self.max_free:
+            free.append(task)
+
+    def clear(self):
+        self.free.clear()
+
+
+class Scheduler(object):
+    def __init__(self):
+        """Runs the task buckets and event bindings"""
+        self.tasks: dict[int, list[Task]] = {
+            TT_TASK: [],
+            TT_DRAW: [],
+            TT_OVERLAY: [],
+            TT_SCREEN: []
+        }
+        self.bindings: dict[int, list[Task]] = {}
+        self.time: float = 0
+        self.frame: int = 0
+        self.timers: list[tuple[float, int, Task, list[Task]]] = []
+        self.tick_timers: list[tuple[int, int, Task, list[Task]]] = []
+        self._timer_ids = itertools.count()
+        self.profiler: TaskProfiler = None
+        # Queues for every priority below PRIORITY_NORMAL exist up front, so tasks started while they run never
+        # add one
+        self.budgeted: dict[int, deque[Task]] = {p: deque() for p in range(PRIORITY_NORMAL - 1, PRIORITY_IDLE - 1, -1)}
+        self.frame_start: float = time.perf_counter()
+        self.deferred: int = 0
+        # Budgeted tasks run this frame, and when set the exact count to run instead of watching the clock
+        self.budget_ran: int = 0
+        self.budget_runs: int = None
+
+    def add(self, task: Task, task_type=TT_TASK):
+        """Add a task to a bucket"""
+        if task.priority < PRIORITY_NORMAL and task_type == TT_TASK:
+            if (queue := self.budgeted.get(task.priority)) is None:
+                queue = self.budgeted[task.priority] = deque()
+                self.budgeted = dict(sorted(self.budgeted.items(), reverse=True))
+            queue.append(task)
+        else:
+            self.tasks[task_type].append(task)
+
+    def bind(self, task: Task, binding: int):
+        """Bind a task to an event type"""
+        if binding not in self.bindings:
+            self.bindings[binding] = []
+        self.bindings[binding].append(task)
+
+    def set_wake(self, task: Task):
+        """Set the wake time of a task that returned Task.park"""
+        if task.delay_ticks:
+            task.wake_time = 0
+            task.wake_frame = self.frame + task.delay_ticks
+        else:
+            task.wake_time = self.time + task.delay
+            task.wake_frame = 0
+
+    def is_due(self, task: Task) -> bool:
+        """Is a parked task due to run again"""
+        return task.wake_time <= self.time and task.wake_frame <= self.frame
+
+    def park(self, task: Task, tasks: list[Task]):
+        """Take a task off the frame loop until its delay has passed, it is put back into tasks on wake"""
+        self.set_wake(task)
+        if task.delay_ticks:
+            heapq.heappush(self.tick_timers, (task.wake_frame, next(self._timer_ids), task, tasks))
+        else:
+            heapq.heappush(self.timers, (task.wake_time, next(self._timer_ids), task, tasks))
+
+    def advance(self, delta_time: float):
+        """Advance the scheduler clock by one frame and wake any due tasks"""
+        self.time += delta_time
+        self.frame += 1
+        self.frame_start = time.perf_counter()
+        self.budget_ran = 0
+        if self.profiler is not None:
+            self.profiler.frame = self.frame
+        timers = self.timers
+        while timers and timers[0][0] <= self.time:
+            _, _, task, tasks = heapq.heappop(timers)
+            tasks.append(task)
+        timers = self.tick_timers
+        while timers and timers[0][0] <= self.frame:
+            _, _, task, tasks = heapq.heappop(timers)
+            tasks.append(task)
+
+    def run_tasks(self, tasks: list[Task], bucket=None):
+        """Run every task once, dropping ended tasks in a single compacting pass"""
+        if self.profiler is not None:
+            return self.run_tasks_profiled(tasks, bucket)
+        end = Task.end
+        park = Task.park
+        write = 0
+        read = 0
+        try:
+            # Kept tasks are written back over slots already read, tasks started during the pass are appended and
+            # the list iterator picks them up
+            for read, task in enumerate(tasks):
+                return_code = task.execute()
+                if return_code == end:
+                    if task.pooled:
+                        task_pool.release(task)
+                elif return_code == park:
+                    self.park(task, tasks)
                 else:
-                    for i, task in enumerate(self.task_list):
+                    tasks[write] = task
+                    write += 1
+            read = len(tasks)
+        finally:
+            # After an exception read is the task that raised, it stays
+            del tasks[write:read]
+
+    def run_tasks_profiled(self, tasks: list[Task], bucket=None):
+        """run_tasks with each task's time recorded to the profiler"""
+        profiler = self.profiler
+        write = 0
+        read = 0
+        try:
+            while read < len(tasks):
+                task = tasks[read]
+                start = time.perf_counter()
+                return_code = task.execute()
+                profiler.record(bucket, task, start, time.perf_counter() - start)
+                read += 1
+                if return_code == Task.end:
+                    if task.pooled:
+                        task_pool.release(task)
+                    continue
+                if return_code == Task.park:
+                    self.park(task, tasks)
+                    continue
+                tasks[write] = task
+                write += 1
+        finally:
+            del tasks[write:read]
+
+    def run_budgeted(self):
+        """Run low priority tasks round robin, highest priority first, until the frame budget is used, or
+        budget_runs of them when that is set (replays). The rest are deferred to the next frame and counted in
+        deferred"""
+        profiler = self.profiler
+        deadline = self.frame_start + shared.task_budget / shared.fps
+        limit = self.budget_runs
+        ran = False
+        exhausted = False
+        self.deferred = 0
+        # A snapshot, set_priority can still pick a priority below PRIORITY_IDLE mid pass
+        for queue in tuple(self.budgeted.values()):
+            pending = len(queue)
+            while pending and not exhausted:
+                task = queue[0]
+                if limit is not None:
+                    if limit <= self.budget_ran:
+                        exhausted = True
+                        break
+                # At least one task runs each frame so deferred work always progresses
+                elif ran and deadline < time.perf_counter() + task.cost:
+                    exhausted = True
+                    break
+                ran = True
+                self.budget_ran += 1
+                pending -= 1
+                queue.popleft()
+                try:
+                    if profiler is None:
                         return_code = task.execute()
-                        if return_code == Task.end:
-                            del self.task_list[i]
-                    if not looping:
-                        return task.end
-                    return task.wait
+                    else:
+                        start = time.perf_counter()
+                        return_code = task.execute()
+                        profiler.record(TT_TASK, task, start, time.perf_counter() - start)
+                except BaseException:
+                    queue.appendleft(task)
+                    raise
+                if return_code == Task.end:
+                    if task.pooled:
+                        task_pool.release(task)
+                    continue
+                if return_code == Task.park:
+                    self.park(task, queue)
+                    continue
+                queue.append(task)
+            self.deferred += pending
+        if profiler is not None:
+            profiler.record_counter("deferred", self.deferred)
+
+    def run(self, task_type=TT_TASK):
+        """Run a bucket once"""
+        if self.profiler is None:
+            self.run_tasks(self.tasks[task_type])
+        else:
+            start = time.perf_counter()
+            self.run_tasks(self.tasks[task_type], task_type)
+            self.profiler.record_bucket(task_type, start, time.perf_counter() - start)
+        if task_type == TT_TASK and any(self.budgeted.values()):
+            self.run_budgeted()
+
+    def run_binding(self, event):
+        """Run the tasks bound to an event type"""
+        if tasks := self.bindings.get(event.type):
+            if self.profiler is None:
+                self.run_tasks(tasks)
             else:
-                if self.end_tasks:
-                    for task in self.end_tasks:
-                        task.execute()
-                    self.end_tasks = None
-                self.task_list = None
-                return task.end
-
-        return Task(sequence, params)
+                self.run_tasks(tasks, f"event {pygame.event.event_name(event.type)}")
 
 
-_bindings: dict[int, list[Task]] = {}
-_tasks: dict[int, list[Task]] = {
-    TT_TASK: [],
-    TT_DRAW: [],
-    TT_OVERLAY: [],
-    TT_SCREEN: []
-}
+scheduler: Scheduler = Scheduler()
+task_pool: TaskPool = TaskPool()
+_bindings: dict[int, list[Task]] = scheduler.bindings
+_tasks: dict[int, list[Task]] = scheduler.tasks
 
 
 def exec_binding(event):
-    for i, task in enumerate(_bindings.get(event.type, [])):
-        return_code = task.execute()
-        if return_code == Task.end:
-            del _bindings[event.type][i]
+    scheduler.run_binding(event)
+
+
+def enable_profiling(capacity: int = 100000) -> TaskProfiler:
+    """Start recording per task timings, see profiler.TaskProfiler"""
+    if scheduler.profiler is None:
+        scheduler.profiler = TaskProfiler(capacity)
+        scheduler.profiler.frame = scheduler.frame
+    return scheduler.profiler
+
+
+def disable_profiling() -> TaskProfiler:
+    """Stop recording per task timings, returns the profiler with what was recorded"""
+    profiler = scheduler.profiler
+    scheduler.profiler = None
+    return profiler
+
+
+def exec_timers():
+    scheduler.advance(shared.delta_time)
 
 
 def exec_tasks(task_type=TT_TASK):
-    for i, task in enumerate(_tasks[task_type]):
-        return_code = task.execute()
-        if return_code == Task.end:
-            del _tasks[task_type][i]
+    scheduler.run(task_type)
@@ -0,0 +1,247 @@
+import numpy
+import pygame
+from numpy import ndarray
+from pygame import Vector2
+from pygame.sprite import Sprite
+import shared
+from level import track
+from task_manager import Task
+
+TWEEN_LERP = 0
+TWEEN_FLOAT = 1
+TWEEN_ORBIT = 2
+
+EASE_LINEAR = 0
+EASE_IN = 1
+EASE_OUT = 2
+EASE_IN_OUT = 3
+
+
+def ease(t: ndarray, easing: ndarray) -> ndarray:
+    """Apply easing curves to normalized times"""
+    out = t.copy()
+    m = easing == EASE_IN
+    out[m] = t[m] * t[m]
+    m = easing == EASE_OUT
+    out[m] = t[m] * (2 - t[m])
+    m = easing == EASE_IN_OUT
+    tm = t[m]
+    out[m] = numpy.where(tm < 0.5, 2 * tm * tm, -1 + (4 - 2 * tm) * tm)
+    return out
+
+
+class TweenSystem(object):
+    def __init__(self, capacity: int = 256):
+        """Moves the rects of many sprites in one vectorized step per frame, one tween per sprite.
+        Per kind the a/b columns are: lerp target and (speed, looping), float amplitudes and speeds,
+        orbit center and (degrees per second, radius)"""
+        self.count = 0
+        self.sprites: list[Sprite] = []
+        self.slots: dict[Sprite, int] = {}
+        self.on_end: dict[Sprite, Task] = {}
+        self.centers: dict[Sprite, Sprite] = {}
+        self.targets: dict[Sprite, Sprite] = {}
+        self.kind: ndarray = numpy.zeros(capacity, numpy.int8)
+        self.easing: ndarray = numpy.zeros(capacity, numpy.int8)
+        self.start: ndarray = numpy.zeros((capacity, 2))
+        self.a: ndarray = numpy.zeros((capacity, 2))
+        self.b: ndarray = numpy.zeros((capacity, 2))
+        self.elapsed: ndarray = numpy.zeros(capacity)
+        self.duration: ndarray = numpy.zeros(capacity)
+        self.last: ndarray = numpy.zeros((capacity, 2), numpy.int64)
+        # Unrounded position from the last step, keeps sub pixel progress for lerps that restart every step
+        self.position: ndarray = numpy.zeros((capacity, 2))
+        self.task: Task = None
+        self.sweep_interval = 60
+        self.frames = 0
+
+    def _grow(self):
+        capacity = len(self.kind) * 2
+        for name in ("kind", "easing", "start", "a", "b", "elapsed", "duration", "last", "position"):
+            old = getattr(self, name)
+            new = numpy.zeros((capacity, *old.shape[1:]), old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _add(self, sprite: Sprite, kind: int, a, b, duration: float = 0, easing: int = EASE_LINEAR,
+             on_end: Task = None) -> int:
+        if sprite in self.slots:
+            self.cancel(sprite)
+        if self.count == len(self.kind):
+            self._grow()
+        track(sprite)
+        i = self.count
+        self.count += 1
+        self.sprites.append(sprite)
+        self.slots[sprite] = i
+        if on_end is not None:
+            self.on_end[sprite] = on_end
+        self.kind[i] = kind
+        self.easing[i] = easing
+        self.start[i] = sprite.rect.center
+        self.a[i] = a
+        self.b[i] = b
+        self.elapsed[i] = 0
+        self.duration[i] = duration
+        self.last[i] = sprite.rect.center
+        self.position[i] = sprite.rect.center
+        if self.task is None:
+            self.task = Task(self.update)
+            self.task.start()
+        return i
+
+    def lerp_position(self, sprite: Sprite, target: Sprite | Vector2, move_speed: float = 300,
+                      easing: int = EASE_LINEAR, on_end: Task = None, looping: bool = False):
+        """Move a sprite to a position or another sprite at a speed, like LerpPosition a speed of 0 never gets there.
+        A sprite target is followed wherever it goes, without easing. Looping keeps following instead of ending"""
+        follow = None
+        if isinstance(target, Sprite):
+            follow = target
+            target = target.rect.center
+            easing = EASE_LINEAR
+        distance = Vector2(target).distance_to(sprite.rect.center)
+        duration = distance / abs(move_speed) if move_speed else numpy.inf
+        self._add(sprite, TWEEN_LERP, target, (move_speed, looping), duration, easing, on_end)
+        if follow is not None:
+            self.targets[sprite] = follow
+
+    def float_movement(self, sprite: Sprite, cos_amp=25, cos_speed=0.01, sin_amp=25, sin_speed=0.01):
+        """Float a sprite around its current position, like FloatMovement"""
+        self._add(sprite, TWEEN_FLOAT, (cos_amp, sin_amp), (cos_speed, sin_speed))
+
+    def circle_follow(self, sprite: Sprite, center: Sprite | Vector2, radius: float = 100, move_speed: float = 90,
+                      clockwise=True, turns: float = None, on_end: Task = None):
+        """Circle a sprite around a position or another sprite, move speed is in degrees per second.
+        Ends after turns full circles, or circles until cancelled"""
+        speed = abs(move_speed) if clockwise else -abs(move_speed)
+        duration = 360 * turns / abs(speed) if turns is not None and speed else numpy.inf
+        follow = None
+        if isinstance(center, Sprite):
+            follow = center
+            center = center.rect.center
+        self._add(sprite, TWEEN_ORBIT, center, (speed, radius), duration, on_end=on_end)
+        if follow is not None:
+            self.centers[sprite] = follow
+
+    def is_active(self, sprite: Sprite) -> bool:
+        return sprite in self.slots
+
+    def cancel(self, sprite: Sprite):
+        """Stop a sprite's tween, leaving it where it is"""
+        i = self.slots.pop(sprite, None)
+        if i is None:
+            return
+        self.on_end.pop(sprite, None)
+        self.centers.pop(sprite, None)
+        self.targets.pop(sprite, None)
+        last = self.count - 1
+        if i != last:
+            moved = self.sprites[last]
+            self.sprites[i] = moved
+            self.slots[moved] = i
+            for name in ("kind", "easing", "start", "a", "b", "elapsed", "duration", "last", "position"):
+                arr = getattr(self, name)
+                arr[i] = arr[last]
+        self.sprites.pop()
+        self.count = last
+
+    def step(self, delta_time: float):
+        """Advance every tween and write back the rects that moved"""
+        n = self.count
+        if not n:
+            return
+        dead = []
+        if self.targets:
+            # A sprite target moves, so its lerp restarts every step from the sprite toward where the target is now
+            rows = []
+            here = []
+            there = []
+            for sprite, target in self.targets.items():
+                if target.alive():
+                    rows.append(self.slots[sprite])
+                    here.append(sprite.rect.center)
+                    there.append(target.rect.center)
+                else:
+                    dead.append(sprite)
+            if rows:
+                rows = numpy.array(rows)
+                here = numpy.array(here, float)
+                # Go on from the unrounded position, unless something else moved the rect since
+                kept = (here == self.last[rows]).all(axis=1)
+                here[kept] = self.position[rows][kept]
+                there = numpy.array(there, float)
+                speed = numpy.abs(self.b[rows, 0])
+                distance = numpy.hypot(*(there - here).T)
+                self.start[rows] = here
+                self.a[rows] = there
+                self.elapsed[rows] = 0
+                self.duration[rows] = numpy.divide(distance, speed, out=numpy.full_like(distance, numpy.inf),
+                                                   where=speed > 0)
+
+        kind = self.kind[:n]
+        elapsed = self.elapsed[:n]
+        elapsed += delta_time
+        pos = numpy.empty((n, 2))
+        finished = numpy.zeros(n, bool)
+
+        m = kind == TWEEN_LERP
+        if m.any():
+            duration = self.duration[:n][m]
+            t = numpy.clip(numpy.divide(elapsed[m], duration, out=numpy.ones_like(duration), where=duration > 0),
+                           0, 1)
+            start = self.start[:n][m]
+            pos[m] = start + (self.a[:n][m] - start) * ease(t, self.easing[:n][m])[:, None]
+            finished[m] = (1 <= t) & (self.b[:n][m][:, 1] == 0)
+
+        m = kind == TWEEN_FLOAT
+        if m.any():
+            ticks = pygame.time.get_ticks()
+            b = self.b[:n][m]
+            pos[m] = self.start[:n][m] + self.a[:n][m] * numpy.stack(
+                (numpy.cos(b[:, 0] * ticks), numpy.sin(b[:, 1] * ticks)), axis=1)
+
+        m = kind == TWEEN_ORBIT
+        if m.any():
+            for sprite, center in self.centers.items():
+                if center.alive():
+                    self.a[self.slots[sprite]] = center.rect.center
+                else:
+                    dead.append(sprite)
+            b = self.b[:n][m]
+            angle = numpy.radians(elapsed[m] * b[:, 0])
+            pos[m] = self.a[:n][m] + b[:, 1:2] * numpy.stack((numpy.cos(angle), numpy.sin(angle)), axis=1)
+            finished[m] = self.duration[:n][m] <= elapsed[m]
+
+        self.position[:n] = pos
+        new = numpy.rint(pos).astype(numpy.int64)
+        last = self.last[:n]
+        changed = numpy.flatnonzero((new != last).any(axis=1))
+        last[changed] = new[changed]
+        sprites = self.sprites
+        for i, center in zip(changed.tolist(), new[changed].tolist()):
+            sprite = sprites[i]
+            if sprite.alive():
+                sprite.rect.center = center
+            else:
+                dead.append(sprite)
+        for i in numpy.flatnonzero(finished).tolist():
+            dead.append(sprites[i])
+        self.frames += 1
+        if self.frames % self.sweep_interval == 0:
+            # Sprites that stopped moving are only checked for being alive here
+            dead.extend([sprite for sprite in sprites if not sprite.alive()])
+        for sprite in dead:
+            on_end = self.on_end.get(sprite)
+            self.cancel(sprite)
+            if on_end is not None and sprite.alive():
+                on_end.execute()
+
+    def update(self, task):
+        self.step(shared.delta_time)
+        if not self.count:
+            self.task = None
+            return task.end
+        return task.cont
+
+
+tween_system: TweenSystem = TweenSystem()
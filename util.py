@@ -1,8 +1,8 @@
 import math
 import random
 import string
-from collections import defaultdict
-from typing import Sequence
+from collections import defaultdict, OrderedDict
+from typing import Callable, Sequence
 import numpy
 import pymunk
 from numpy import ndarray
@@ -189,6 +189,68 @@ def rotate_image(original_image: Surface, angle: float, center) -> tuple[Surface
     return rotated_image, new_rect
 
 
+class TransformCache(object):
+    def __init__(self, angle_step: float = 1, byte_budget: int = 64 * 2 ** 20):
+        """LRU cache of transformed surfaces keyed by source surface, angle bucket and size.
+        Returned surfaces are shared, copy one before drawing into it"""
+        self.angle_step = angle_step
+        self.byte_budget = byte_budget
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries: OrderedDict[tuple, Surface] = OrderedDict()
+
+    def get(self, key: tuple, make: Callable[[], Surface]) -> Surface:
+        """Get a cached surface or make and cache it"""
+        if (surface := self.entries.get(key)) is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = make()
+        size = surface.get_pitch() * surface.get_height()
+        if size <= self.byte_budget:
+            self.entries[key] = surface
+            self.bytes += size
+            while self.bytes > self.byte_budget:
+                _, old = self.entries.popitem(last=False)
+                self.bytes -= old.get_pitch() * old.get_height()
+        return surface
+
+    def rotate(self, surface: Surface, angle: float) -> Surface:
+        """Rotated surface, the angle is snapped to angle_step"""
+        steps = round(360 / self.angle_step)
+        bucket = round(angle / self.angle_step) % steps
+        return self.get((surface, "rotate", bucket),
+                        lambda: pygame.transform.rotate(surface, bucket * self.angle_step))
+
+    def scale(self, surface: Surface, size: Sequence[float], smooth: bool = False) -> Surface:
+        """Scaled surface"""
+        size = (int(size[0]), int(size[1]))
+        if smooth:
+            return self.get((surface, "smoothscale", size), lambda: pygame.transform.smoothscale(surface, size))
+        return self.get((surface, "scale", size), lambda: pygame.transform.scale(surface, size))
+
+    def set_resolution(self, angle_step: float):
+        """Change the angle step, cached rotations are dropped"""
+        self.angle_step = angle_step
+        self.clear()
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+
+transform_cache: TransformCache = TransformCache()
+
+
+def rotate_image_cached(original_image: Surface, angle: float, center) -> tuple[Surface, Rect]:
+    """Rotate image through the transform cache, the image is shared"""
+    rotated_image = transform_cache.rotate(original_image, angle)
+    new_rect = rotated_image.get_rect(center=center)
+    return rotated_image, new_rect
+
+
 def scale_image_basic(original_image: Surface, new_size: tuple, center) -> tuple[Surface, Rect]:
     """Scale image basic"""
     new_image = pygame.transform.scale(original_image, new_size)
@@ -197,8 +259,8 @@ def scale_image_basic(original_image: Surface, new_size: tuple, center) -> tuple
 
 
 def scale_image_smooth(original_image: Surface, new_size: Sequence[float], center) -> tuple[Surface, Rect]:
-    """Scale image smooth"""
-    new_image = pygame.transform.smoothscale(original_image, new_size)
+    """Scale image smooth, the image comes from the transform cache and is shared"""
+    new_image = transform_cache.scale(original_image, new_size, True)
     new_rect = new_image.get_rect(center=center)
     return new_image, new_rect
 
@@ -213,9 +275,11 @@ def create_hover_img(surface: Surface, color=(100, 100, 100, 150)):
 
 
 def create_sized_img(surface: Surface, size=(64, 64), center=(0, 0)):
-    """Create a scaled image"""
-    s = surface.copy().convert_alpha()
-    return scale_image_basic(s, size, center)
+    """Create a scaled image, the image comes from the transform cache and is shared"""
+    size = (int(size[0]), int(size[1]))
+    new_image = transform_cache.get((surface, "sized", size),
+                                    lambda: pygame.transform.scale(surface.convert_alpha(), size))
+    return new_image, new_image.get_rect(center=center)
 
 
 def float_movement_sin(amplitude: float = 25, speed: float = 1):